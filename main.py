@@ -6,6 +6,22 @@ A PyQt6 application that generates test cases from images or documents using Gem
 import sys
 import os
 import json
+import codecs
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import math
+import mimetypes
+import mmap
+import multiprocessing
+import queue
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List
@@ -15,23 +31,38 @@ from PyQt6.QtWidgets import (
     QLabel, QPushButton, QTextEdit, QFileDialog, QFrame, QScrollArea,
     QSplitter, QTabWidget, QProgressBar, QMessageBox, QLineEdit,
     QComboBox, QCheckBox, QGroupBox, QGridLayout, QSizePolicy,
-    QButtonGroup, QRadioButton, QStackedWidget, QSpacerItem
+    QButtonGroup, QRadioButton, QStackedWidget, QSpacerItem, QListWidget,
+    QListWidgetItem, QListView, QStyledItemDelegate, QStyle
+)
+from PyQt6.QtCore import (
+    Qt, QThread, QObject, pyqtSignal, QSize, QPropertyAnimation, QEasingCurve, QTimer,
+    QAbstractListModel, QModelIndex, QRect, QPoint, QEvent
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QPropertyAnimation, QEasingCurve, QTimer
 from PyQt6.QtGui import (
     QPixmap, QFont, QColor, QPalette, QDragEnterEvent, QDropEvent,
-    QIcon, QPainter, QLinearGradient, QBrush, QPen
+    QIcon, QPainter, QLinearGradient, QBrush, QPen, QTextCursor, QImage, QImageReader
 )
 
 import google.generativeai as genai
-from PIL import Image
+from google.api_core import exceptions as google_exceptions
+from PIL import Image, ImageOps
 import PyPDF2
-import docx
 import re
+import zipfile
+from xml.etree import ElementTree
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 
+try:
+    import cv2  # Optional: local keyframe extraction for video mode
+except ImportError:
+    cv2 = None
+
+
+GEMINI_MODEL = "gemini-2.0-flash"
+APP_DATA_DIR = Path.home() / ".android_test_generator"
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # STYLING - Cyberpunk/Neon Theme
@@ -219,24 +250,6 @@ QPushButton#addImageBtn:hover {
     color: #0a0a0f;
 }
 
-QPushButton#removeImageBtn {
-    background: rgba(255, 107, 107, 0.8);
-    border: none;
-    color: white;
-    padding: 2px 6px;
-    font-size: 10px;
-    font-weight: bold;
-    border-radius: 10px;
-    min-height: 16px;
-    min-width: 16px;
-    max-height: 20px;
-    max-width: 20px;
-}
-
-QPushButton#removeImageBtn:hover {
-    background: #ff6b6b;
-}
-
 QLineEdit {
     background: #1a1a2e;
     border: 1px solid #2d2d44;
@@ -496,234 +509,3266 @@ QFrame#inputStatusFrame {
     border-radius: 8px;
     padding: 12px;
 }
+"""
 
-QFrame#imageThumbnail {
-    background: #12121a;
-    border: 1px solid #2d2d44;
-    border-radius: 8px;
-    padding: 4px;
-}
 
-QFrame#imageThumbnail:hover {
-    border-color: #00ffd5;
-}
-"""
+# ═══════════════════════════════════════════════════════════════════════════════
+# RESPONSE CACHE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file's bytes without loading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CacheDirectory:
+    """Files named by key in one directory, evicted least recently used first over a size cap."""
+    
+    def __init__(self, path: Path, suffix: str, max_bytes: int):
+        self.path = Path(path)
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+    
+    def entry_path(self, key: str) -> Path:
+        return self.path / f"{key}{self.suffix}"
+    
+    def evict(self):
+        """Delete the oldest entries until the directory fits within max_bytes."""
+        entries = []
+        for path in self.path.glob(f"*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+    
+    def clear(self):
+        for path in self.path.glob(f"*{self.suffix}"):
+            path.unlink(missing_ok=True)
+
+
+class JsonStore:
+    """Thread-safe JSON entries in a CacheDirectory, optionally gzip-compressed.
+    
+    Reading an entry marks it as recently used; corrupt entries read as misses.
+    """
+    
+    def __init__(self, path: Path, max_bytes: int, compress: bool = False):
+        self.files = CacheDirectory(path, ".json.gz" if compress else ".json", max_bytes)
+        self.compress = compress
+        self._lock = threading.Lock()
+    
+    def _open(self, path: Path, mode: str):
+        if self.compress:
+            return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+        return open(path, mode, encoding='utf-8')
+    
+    def get(self, key: str) -> Optional[dict]:
+        """Return the entry for key, or None on a miss."""
+        path = self.files.entry_path(key)
+        with self._lock:
+            try:
+                with self._open(path, 'r') as f:
+                    entry = json.load(f)
+                if not isinstance(entry, dict):
+                    raise ValueError("Cache entry is not an object")
+                os.utime(path)  # Mark as recently used
+                return entry
+            except FileNotFoundError:
+                return None
+            except (OSError, ValueError, EOFError):
+                # Corrupt entry - drop it and treat as a miss
+                path.unlink(missing_ok=True)
+                return None
+    
+    def put(self, key: str, entry: dict):
+        """Store an entry and evict least recently used entries over the size cap."""
+        path = self.files.entry_path(key)
+        with self._lock:
+            self.files.path.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{key}.tmp")
+            with self._open(tmp_path, 'w') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self.files.evict()
+    
+    def delete(self, key: str):
+        with self._lock:
+            self.files.entry_path(key).unlink(missing_ok=True)
+    
+    def clear(self):
+        with self._lock:
+            self.files.clear()
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache of generated responses with LRU eviction."""
+    
+    def __init__(self, cache_dir: Path, max_bytes: int = 50 * 1024 * 1024):
+        self._store = JsonStore(cache_dir, max_bytes)
+    
+    @staticmethod
+    def make_key(prompt: str, image_digests: List[str], video_hash: Optional[str], model_name: str,
+                 options: str = "") -> str:
+        """Build a cache key from everything that influences the response.
+        
+        image_digests are the file_sha256() of each image, in request order.
+        """
+        digest = hashlib.sha256()
+        for part in (model_name, prompt, video_hash or "", options):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        for image_digest in image_digests:
+            digest.update(image_digest.encode('ascii'))
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss."""
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if not isinstance(entry.get("text"), str):
+            self._store.delete(key)
+            return None
+        return entry["text"]
+    
+    def put(self, key: str, text: str):
+        """Store a response and evict least recently used entries over the size cap."""
+        self._store.put(key, {"created_at": datetime.now().isoformat(), "text": text})
+    
+    def clear(self):
+        """Remove every cached response."""
+        self._store.clear()
+
+
+RESPONSE_CACHE = ResponseCache(APP_DATA_DIR / "response_cache")
+
+
+DOCUMENT_PARSER_VERSION = 2  # Bump when read_document() output changes
+
+
+class DocumentCache:
+    """Gzip-compressed cache of parsed documents with LRU eviction.
+    
+    Entries are keyed by file identity (path, size, mtime) and only trusted
+    while the file's content hash still matches.
+    """
+    
+    def __init__(self, cache_dir: Path, max_bytes: int = 100 * 1024 * 1024):
+        self._store = JsonStore(cache_dir, max_bytes, compress=True)
+    
+    @staticmethod
+    def identity_key(path: str) -> str:
+        stat = os.stat(path)
+        identity = f"{DOCUMENT_PARSER_VERSION}|{Path(path).resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+    
+    def load(self, path: str) -> Optional[dict]:
+        """Return the cached read_document() result for an unchanged file, or None."""
+        key = self.identity_key(path)
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if entry.get("sha256") != file_sha256(path):
+            # Same size and mtime but different bytes - stale
+            self._store.delete(key)
+            return None
+        document = entry["document"]
+        document["failed_pages"] = {int(page): error for page, error in document["failed_pages"].items()}
+        return document
+    
+    def store(self, identity_key: str, content_hash: str, document: dict):
+        """Cache a parsed document under the identity and hash taken before parsing."""
+        self._store.put(identity_key, {
+            "created_at": datetime.now().isoformat(),
+            "sha256": content_hash,
+            "document": document,
+        })
+
+
+DOCUMENT_CACHE = DocumentCache(APP_DATA_DIR / "document_cache", max_bytes=100 * 1024 * 1024)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
-# GEMINI API WORKER THREAD
+# GEMINI CLIENT POOL
 # ═══════════════════════════════════════════════════════════════════════════════
 
-class GeminiWorker(QThread):
-    """Background worker for Gemini API calls."""
+class UploadProgressReader(io.FileIO):
+    """Read-only file that reports how far an upload has read it.
     
-    finished = pyqtSignal(str)
-    error = pyqtSignal(str)
-    progress = pyqtSignal(int)
+    The HTTP client reads the request body in small blocks as it sends it, so
+    progress_callback(read_bytes, total_bytes) follows the upload; an exception
+    raised from it aborts the upload.
+    """
     
-    def __init__(self, api_key: str, image_paths: List[str], document_content: Optional[str],
-                 video_path: Optional[str], test_type: str, app_context: str, input_mode: str):
-        super().__init__()
+    def __init__(self, path: str, progress_callback):
+        super().__init__(path, 'rb')
+        self.total = os.fstat(self.fileno()).st_size
+        self.progress_callback = progress_callback
+    
+    def read(self, size: int = -1) -> bytes:
+        data = super().read(size)
+        self.progress_callback(self.tell(), self.total)
+        return data
+
+
+class GeminiClient:
+    """Gemini session for one API key and model, built on the public SDK calls.
+    
+    The SDK keeps one process-wide configuration, so GeminiClientPool only
+    reconfigures it when a different key is borrowed and the JobScheduler
+    never runs jobs for two keys at once. Models bind to the configured key
+    on their first request and keep reusing its connections.
+    """
+    
+    def __init__(self, api_key: str, model_name: str):
         self.api_key = api_key
-        self.image_paths = image_paths  # Now a list of paths
-        self.document_content = document_content
-        self.video_path = video_path
-        self.test_type = test_type
-        self.app_context = app_context
-        self.input_mode = input_mode
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
     
-    def run(self):
-        try:
-            self.progress.emit(10)
-            genai.configure(api_key=self.api_key)
-            
-            self.progress.emit(20)
-            
-            # Use gemini-1.5-flash for all cases
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            
-            self.progress.emit(40)
-            
-            # Build the prompt
-            prompt = self._build_prompt()
-            
-            self.progress.emit(50)
-            
-            # Prepare content for the API call
-            content = []
-            
-            # Add all images if we're in image or combined mode
-            if self.image_paths and self.input_mode in ("image", "combined"):
-                for img_path in self.image_paths:
-                    img = Image.open(img_path)
-                    content.append(img)
-            
-            # Add video if in video mode
-            if self.video_path and self.input_mode == "video":
-                # Upload video file to Gemini
-                video_file = genai.upload_file(path=self.video_path)
-                # Wait for processing
-                import time
-                while video_file.state.name == "PROCESSING":
-                    time.sleep(2)
-                    video_file = genai.get_file(video_file.name)
-                
-                if video_file.state.name == "FAILED":
-                    raise Exception("Video processing failed")
-                
-                content.append(video_file)
-            
-            content.append(prompt)
-            
-            self.progress.emit(70)
-            
-            # Generate response
-            response = model.generate_content(content)
-            
-            self.progress.emit(90)
-            
-            result = response.text
-            
-            self.progress.emit(100)
-            self.finished.emit(result)
-            
-        except Exception as e:
-            self.error.emit(str(e))
+    def generative_model(self, **kwargs) -> genai.GenerativeModel:
+        """Return the shared model, or a new one with custom settings."""
+        if not kwargs:
+            return self.model
+        return genai.GenerativeModel(self.model_name, **kwargs)
     
-    def _build_prompt(self) -> str:
-        """Build the prompt for test case generation."""
-        
-        num_images = len(self.image_paths) if self.image_paths else 0
-        
-        base_prompt = f"""You are an expert Android QA Engineer and Test Automation Specialist. 
-Your task is to generate comprehensive test cases for an Android mobile application.
+    def upload_file(self, path: str, mime_type: Optional[str] = None, progress_callback=None):
+        """Upload a file, calling progress_callback(sent_bytes, total_bytes) as it is sent.
+        
+        An exception raised from progress_callback aborts the upload.
+        """
+        file_path = Path(path)
+        if mime_type is None:
+            mime_type, _ = mimetypes.guess_type(file_path)
+        if mime_type is None:
+            raise ValueError(f"Could not determine the MIME type of {file_path.name}")
+        
+        report = progress_callback or (lambda sent, total: None)
+        with UploadProgressReader(str(file_path), report) as reader:
+            video_file = genai.upload_file(reader, mime_type=mime_type, display_name=file_path.name)
+        report(reader.total, reader.total)
+        return video_file
+    
+    def get_file(self, name: str):
+        return genai.get_file(name)
+    
+    def create_cached_content(self, contents: list, ttl: float) -> genai.caching.CachedContent:
+        """Cache contents on Gemini for ttl seconds."""
+        return genai.caching.CachedContent.create(model=self.model_name, contents=contents, ttl=int(ttl))
+    
+    def cached_model(self, cache_name: str) -> genai.GenerativeModel:
+        """Return a model that answers prompts against a cached context."""
+        return genai.GenerativeModel.from_cached_content(cache_name)
 
-**Test Type Requested:** {self.test_type}
 
-**Application Context:** {self.app_context if self.app_context else "General Android application"}
+class GeminiClientPool:
+    """Thread-safe pool of GeminiClient sessions keyed by (api_key, model)."""
+    
+    def __init__(self):
+        self._clients = {}
+        self._configured_key: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    def get(self, api_key: str, model_name: str = GEMINI_MODEL) -> GeminiClient:
+        """Borrow the shared session for this key and model, creating it once.
+        
+        Switching keys reconfigures the SDK and starts fresh sessions, since
+        models stay bound to the key they first used.
+        """
+        key = (api_key, model_name)
+        with self._lock:
+            if api_key != self._configured_key:
+                genai.configure(api_key=api_key)
+                self._configured_key = api_key
+                self._clients.clear()
+            client = self._clients.get(key)
+            if client is None:
+                client = GeminiClient(api_key, model_name)
+                self._clients[key] = client
+            return client
 
-"""
-        
-        if self.input_mode == "combined" and self.image_paths and self.document_content:
-            base_prompt += f"""**Input Mode:** COMBINED (Images + Document)
 
-You have been provided with:
-1. {num_images} screenshot(s)/image(s) of the Android app screens
-2. A document with additional specifications/requirements
+CLIENT_POOL = GeminiClientPool()
 
-Analyze ALL images and the document content together to generate comprehensive test cases. The images show the visual UI and user flow while the document provides context, requirements, and specifications.
 
-**Document Content:**
-""" + self.document_content + """
+# ═══════════════════════════════════════════════════════════════════════════════
+# VIDEO UPLOAD REGISTRY
+# ═══════════════════════════════════════════════════════════════════════════════
 
-"""
-        elif self.input_mode == "image" and self.image_paths:
-            base_prompt += f"""**Input Mode:** IMAGE ONLY ({num_images} image(s) provided)
+UPLOAD_DEFAULT_LIFETIME = 48 * 3600  # Gemini keeps uploaded files for 48 hours
+UPLOAD_EXPIRY_MARGIN = 3600  # Don't reuse files that expire within the hour
+VIDEO_POLL_INITIAL = 0.5
+VIDEO_POLL_MAX = 10.0
+VIDEO_PROCESSING_TIMEOUT = 600.0
 
-Analyze the provided {num_images} screenshot(s)/image(s) to identify:
-1. UI elements (buttons, text fields, lists, dropdowns, etc.)
-2. Navigation patterns and screen flow indicators
-3. User interaction points and touch targets
-4. Visual states and feedback indicators
-5. Relationships between different screens (if multiple images)
-6. Potential edge cases based on visible UI elements
 
-"""
-        elif self.input_mode == "document" and self.document_content:
-            base_prompt += """**Input Mode:** DOCUMENT ONLY
+class UploadRegistry:
+    """Persistent map of content hashes to resources already created on Gemini.
+    
+    Used for uploaded videos and cached contexts. Entries are scoped to the API
+    key (by fingerprint) because both are only visible to the owning project.
+    """
+    
+    def __init__(self, path: Path, expiry_margin: float = UPLOAD_EXPIRY_MARGIN):
+        self.path = Path(path)
+        self.expiry_margin = expiry_margin
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(api_key: str, content_hash: str) -> str:
+        fingerprint = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+        return f"{fingerprint}:{content_hash}"
+    
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save(self, entries: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def get(self, api_key: str, content_hash: str) -> Optional[str]:
+        """Return the resource name if it is still comfortably before expiry."""
+        with self._lock:
+            entry = self._load().get(self._key(api_key, content_hash))
+        if entry and entry["expires_at"] - self.expiry_margin > time.time():
+            return entry["name"]
+        return None
+    
+    def put(self, api_key: str, content_hash: str, name: str, expires_at: float):
+        """Record an upload and prune expired entries."""
+        with self._lock:
+            now = time.time()
+            entries = {k: v for k, v in self._load().items() if v["expires_at"] > now}
+            entries[self._key(api_key, content_hash)] = {"name": name, "expires_at": expires_at}
+            self._save(entries)
+    
+    def discard(self, api_key: str, content_hash: str):
+        with self._lock:
+            entries = self._load()
+            if entries.pop(self._key(api_key, content_hash), None) is not None:
+                self._save(entries)
 
-Analyze the provided document containing specifications/requirements:
 
-**Document Content:**
-""" + self.document_content + """
+UPLOAD_REGISTRY = UploadRegistry(APP_DATA_DIR / "video_uploads.json")
 
-"""
-        elif self.input_mode == "video" and self.video_path:
-            base_prompt += """**Input Mode:** VIDEO ANALYSIS (Premium Feature)
+# Context caching: the document and media are stored on Gemini once and every
+# test type's prompt is answered against that cache until it expires.
+CONTEXT_CACHE_TTL = 3600  # Seconds; storage is billed for as long as the cache lives
+CONTEXT_CACHE_EXPIRY_MARGIN = 120  # Don't start a request on a cache about to expire
+CONTEXT_CACHE_MIN_TOKENS = 4096  # Gemini rejects smaller cached contexts
+CACHED_DOCUMENT_NOTE = "[The full document is provided in the cached context above.]"
 
-Analyze the provided video recording of the Android app to identify:
-1. User interactions and gestures (taps, swipes, scrolls, long presses)
-2. Screen transitions and navigation flow
-3. UI elements that appear during the recording
-4. Loading states and animations
-5. Error states or unexpected behaviors
-6. Timing between actions and responses
-7. Complete user journey/workflow captured in the video
+CONTEXT_CACHE_REGISTRY = UploadRegistry(
+    APP_DATA_DIR / "context_caches.json", expiry_margin=CONTEXT_CACHE_EXPIRY_MARGIN
+)
 
-Focus on creating test cases that:
-- Verify the exact flow shown in the video
-- Test timing and responsiveness
-- Cover the user interactions demonstrated
-- Include edge cases based on the observed behavior
 
-"""
-        
-        base_prompt += """
-**Generate Test Cases in this CLEAN, EASY-TO-READ format:**
+# ═══════════════════════════════════════════════════════════════════════════════
+# RETRY POLICY
+# ═══════════════════════════════════════════════════════════════════════════════
 
-══════════════════════════════════════════════════════════════════════════════
-                         TEST SUITE: [Feature Name]
-══════════════════════════════════════════════════════════════════════════════
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,  # 429
+    google_exceptions.TooManyRequests,
+    google_exceptions.InternalServerError,  # 500
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,  # 503
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.Aborted,
+    TimeoutError,
+    ConnectionError,
+)
 
-For EACH test case, use this EXACT format:
 
-──────────────────────────────────────────────────────────────────────────────
-TEST CASE ID:     TC-001
-TEST CASE NAME:   [Clear descriptive title]
-──────────────────────────────────────────────────────────────────────────────
+def is_retryable(error: Exception) -> bool:
+    """Whether an error is transient and worth retrying."""
+    return isinstance(error, RETRYABLE_ERRORS)
 
-    PRIORITY:       [High / Medium / Low]
-    TYPE:           [Functional / UI / Security / Performance]
+
+def request_options(timeout: float) -> dict:
+    """SDK request options with the client's own retry disabled.
     
-    ▸ PRECONDITIONS:
-      - Condition 1
-      - Condition 2
+    The default google-api-core retry silently retries 429/503 for minutes,
+    so RetryPolicy must be the only retry layer to see (and bound) them.
+    """
+    return {"timeout": timeout, "retry": None}
+
+
+class RetryPolicy:
+    """Retry limits and jittered exponential backoff for generate_content."""
     
-    ▸ TEST STEPS:
-      Step 1:  [First action to perform]
-      Step 2:  [Second action to perform]
-      Step 3:  [Third action to perform]
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 20.0,
+                 attempt_timeout: float = 120.0, overall_deadline: float = 300.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.overall_deadline = overall_deadline
     
-    ▸ EXPECTED RESULTS:
-      ✓ Result 1
-      ✓ Result 2
-      ✓ Result 3
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before the attempt following `attempt`."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies."""
     
-    ▸ TEST DATA:
-      [Any input data, test values, or N/A]
+    def __init__(self, window: int = 50, min_samples: int = 5, default: float = 30.0):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.min_samples = min_samples
+        self.default = default
     
-    ▸ AUTOMATION NOTES:
-      [Espresso/Appium hints, element IDs, locators]
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, pct: float) -> float:
+        """Latency at the given percentile, or the default until enough samples exist."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return self.default
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
 
-══════════════════════════════════════════════════════════════════════════════
 
+LATENCY_TRACKER = LatencyTracker()
 
-FORMATTING RULES:
-1. Use ══════ for major section dividers
-2. Use ────── for test case separators
-3. Use ▸ for section headers within test case
-4. Use ✓ for expected results
-5. Use - for list items
-6. Use Step 1:, Step 2: etc for numbered steps
-7. Keep each section clearly labeled and indented
-8. Add blank lines between sections for readability
 
-Generate 10-15 comprehensive test cases covering:
-- Positive scenarios (happy path)
-- Negative scenarios (error handling, invalid inputs)
-- Boundary conditions (min/max values, empty states)
-- UI/UX validation (layout, responsiveness)
-- Edge cases (network issues, interruptions)
-- Security considerations (input validation)
+# ═══════════════════════════════════════════════════════════════════════════════
+# IMAGE PREPROCESSING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+IMAGE_MAX_EDGE_OPTIONS = [("1536 px (recommended)", 1536), ("2048 px", 2048),
+                          ("1024 px", 1024), ("768 px", 768), ("Original size", 0)]
+IMAGE_FORMAT = "WEBP"
+IMAGE_QUALITY = 85
+IMAGE_MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound preprocessing."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Spawn rather than fork: forking a multithreaded Qt process can copy
+            # locks held by other threads and deadlock the children
+            _process_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 2, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+
+def shutdown_process_pool():
+    """Stop the shared process pool, dropping queued work. Called on application exit."""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def preprocess_image(path: str, max_edge: int = 1536, fmt: str = IMAGE_FORMAT,
+                     quality: int = IMAGE_QUALITY) -> dict:
+    """Downsize and re-encode a screenshot into a compact inline blob.
+    
+    Caps the longest edge at max_edge (0 keeps the original size), applies
+    EXIF orientation and drops all metadata. Runs in a worker process.
+    """
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        if max_edge and max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        
+        if fmt == "JPEG" and img.mode != "RGB":
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+        
+        # Saving without exif/pnginfo strips the original metadata
+        buffer = io.BytesIO()
+        img.save(buffer, format=fmt, quality=quality, optimize=True)
+    return {"mime_type": IMAGE_MIME_TYPES[fmt], "data": buffer.getvalue()}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VIDEO KEYFRAME EXTRACTION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+KEYFRAME_SAMPLE_FPS = 2.0
+KEYFRAME_DIFF_THRESHOLD = 0.05  # Mean absolute difference (0-1) from the last keyframe
+KEYFRAME_DIFF_SIZE = (72, 128)  # Frames are compared at this size, in grayscale
+KEYFRAME_MAX_FRAMES = 60
+KEYFRAME_MAX_EDGE = 1024
+KEYFRAME_JPEG_QUALITY = 85
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as MM:SS.s for keyframe labels."""
+    return f"{int(seconds // 60):02d}:{seconds % 60:04.1f}"
+
+
+def extract_keyframes(video_path: str, threshold: float = KEYFRAME_DIFF_THRESHOLD,
+                      sample_fps: float = KEYFRAME_SAMPLE_FPS, max_frames: int = KEYFRAME_MAX_FRAMES,
+                      max_edge: int = KEYFRAME_MAX_EDGE, progress_callback=None) -> List[dict]:
+    """Decode a screen recording locally and keep only frames where the screen changed.
+    
+    Frames are sampled at sample_fps and compared with the previous keyframe;
+    each kept frame is returned as {"timestamp", "mime_type", "data"} with
+    JPEG bytes capped at max_edge. progress_callback(frames_read, total_frames)
+    is called as decoding advances.
+    """
+    if cv2 is None:
+        raise RuntimeError("Keyframe mode requires OpenCV: pip install opencv-python-headless")
+    
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {Path(video_path).name}")
+    
+    keyframes = []
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        step = max(1, int(round(fps / sample_fps)))
+        previous = None
+        index = 0
+        
+        while True:
+            # grab() skips decoding frames we don't sample
+            if index % step:
+                if not capture.grab():
+                    break
+                index += 1
+                continue
+            
+            ok, frame = capture.read()
+            if not ok:
+                break
+            
+            small = cv2.cvtColor(
+                cv2.resize(frame, KEYFRAME_DIFF_SIZE, interpolation=cv2.INTER_AREA),
+                cv2.COLOR_BGR2GRAY
+            )
+            diff = 1.0 if previous is None else float(cv2.absdiff(small, previous).mean()) / 255
+            if diff >= threshold:
+                previous = small
+                keyframes.append({
+                    "timestamp": index / fps,
+                    "mime_type": "image/jpeg",
+                    "data": _encode_frame(frame, max_edge),
+                })
+            
+            index += 1
+            if progress_callback and total:
+                progress_callback(min(index, total), total)
+    finally:
+        capture.release()
+    
+    if progress_callback and total:
+        progress_callback(total, total)
+    
+    # Too many scene changes: keep an even spread across the recording
+    if len(keyframes) > max_frames:
+        stride = len(keyframes) / max_frames
+        keyframes = [keyframes[int(i * stride)] for i in range(max_frames)]
+    return keyframes
+
+
+def _encode_frame(frame, max_edge: int) -> bytes:
+    """Downscale a BGR frame and encode it as JPEG."""
+    height, width = frame.shape[:2]
+    scale = max_edge / max(height, width)
+    if scale < 1:
+        frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, KEYFRAME_JPEG_QUALITY])
+    if not ok:
+        raise ValueError("Failed to encode video frame")
+    return encoded.tobytes()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PERCEPTUAL HASHING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+DUPLICATE_HASH_THRESHOLD = 4  # Max differing bits (of 64) for two screenshots to count as duplicates
+
+
+def perceptual_hash(path: str, hash_size: int = 8) -> int:
+    """64-bit difference hash (dHash) of an image, robust to small local changes."""
+    with Image.open(path) as img:
+        img.draft("L", (hash_size * 8, hash_size * 8))  # Cheap partial decode for JPEGs
+        small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class HammingIndex:
+    """Multi-index hash table for finding hashes within a fixed Hamming radius.
+    
+    Hashes are split into radius + 1 bit bands. Two hashes within the radius
+    must agree exactly on at least one band (pigeonhole), so a search only
+    compares against hashes sharing a band bucket instead of every stored hash.
+    """
+    
+    def __init__(self, radius: int = DUPLICATE_HASH_THRESHOLD, bits: int = 64):
+        self.radius = radius
+        bands = radius + 1
+        width = -(-bits // bands)
+        self._shifts = [band * width for band in range(bands)]
+        self._mask = (1 << width) - 1
+        self._tables = [{} for _ in range(bands)]  # band value -> [(hash, item)]
+    
+    def _keys(self, value: int):
+        last = len(self._shifts) - 1
+        for band, shift in enumerate(self._shifts):
+            # The last band keeps any bits past `bits`, so longer hashes still index correctly
+            yield value >> shift if band == last else (value >> shift) & self._mask
+    
+    def add(self, value: int, item):
+        for table, key in zip(self._tables, self._keys(value)):
+            table.setdefault(key, []).append((value, item))
+    
+    def remove(self, value: int, item):
+        for table, key in zip(self._tables, self._keys(value)):
+            bucket = table.get(key)
+            if bucket and (value, item) in bucket:
+                bucket.remove((value, item))
+                if not bucket:
+                    del table[key]
+    
+    def search(self, value: int) -> list:
+        """Items whose hash is within the radius of value."""
+        results = []
+        seen = set()
+        for table, key in zip(self._tables, self._keys(value)):
+            for candidate, item in table.get(key, ()):
+                if item not in seen and hamming_distance(value, candidate) <= self.radius:
+                    seen.add(item)
+                    results.append(item)
+        return results
+
+
+def find_near_duplicates(image_paths: List[str], hashes: dict,
+                         threshold: int = DUPLICATE_HASH_THRESHOLD) -> dict:
+    """Map each near-duplicate image to the earliest kept image it duplicates.
+    
+    Images without a hash are never treated as duplicates. Kept images are
+    held in a HammingIndex, so each image is only compared with likely matches.
+    """
+    index = HammingIndex(threshold)
+    duplicates = {}
+    for position, path in enumerate(image_paths):
+        value = hashes.get(path)
+        if value is None:
+            continue
+        matches = index.search(value)
+        if matches:
+            duplicates[path] = image_paths[min(matches)]
+        else:
+            index.add(value, position)
+    return duplicates
+
+
+class NearDuplicateIndex:
+    """Incrementally maintained find_near_duplicates result.
+    
+    Hashes may arrive in any order; each carries the image's selection order.
+    After every add() or remove() the duplicates map equals what
+    find_near_duplicates would return for the hashed images, but only images
+    within the radius of the change are re-examined.
+    """
+    
+    def __init__(self, threshold: int = DUPLICATE_HASH_THRESHOLD):
+        self._hashed = HammingIndex(threshold)  # Every hashed image
+        self._kept = HammingIndex(threshold)  # Images that are not duplicates
+        self._hashes = {}  # path -> hash
+        self._order = {}  # path -> selection order
+        self.duplicates = {}  # duplicate path -> original path
+    
+    def add(self, path: str, value: int, order: int) -> dict:
+        """Index a hash; returns {path: original or None} for every image whose status changed."""
+        if path in self._hashes:
+            return {}
+        self._hashes[path] = value
+        self._order[path] = order
+        self._hashed.add(value, path)
+        self._kept.add(value, path)
+        changes = self._settle([path])
+        if path not in self.duplicates:
+            # A new original may claim later images from a later original
+            changes.update(self._settle(self._later_neighbours(value, order)))
+        return changes
+    
+    def remove(self, path: str) -> dict:
+        """Drop an image; returns {path: original or None} for every image whose status changed."""
+        value = self._hashes.pop(path, None)
+        if value is None:
+            return {}
+        self._hashed.remove(value, path)
+        changes = {}
+        if self.duplicates.pop(path, None) is not None:
+            changes[path] = None
+            del self._order[path]
+            return changes  # Nothing depends on a duplicate
+        self._kept.remove(value, path)
+        order = self._order.pop(path)
+        changes.update(self._settle(self._later_neighbours(value, order)))
+        return changes
+    
+    def _later_neighbours(self, value: int, order: int) -> List[str]:
+        return [other for other in self._hashed.search(value) if self._order[other] > order]
+    
+    def _settle(self, paths: List[str]) -> dict:
+        """Re-examine images in selection order, following status changes forward."""
+        changes = {}
+        heap = [(self._order[path], path) for path in paths]
+        heapq.heapify(heap)
+        done = set()
+        while heap:
+            order, path = heapq.heappop(heap)
+            if path in done:
+                continue
+            done.add(path)
+            value = self._hashes[path]
+            earlier = [other for other in self._kept.search(value) if self._order[other] < order]
+            original = min(earlier, key=self._order.__getitem__) if earlier else None
+            previous = self.duplicates.get(path)
+            if original == previous:
+                continue
+            if original is None:
+                del self.duplicates[path]
+                self._kept.add(value, path)
+            else:
+                self.duplicates[path] = original
+                if previous is None:
+                    self._kept.remove(value, path)
+            changes[path] = original
+            if (original is None) != (previous is None):
+                # Kept status flipped, so later images may now match a different original
+                for other in self._later_neighbours(value, order):
+                    heapq.heappush(heap, (self._order[other], other))
+        return changes
+
+
+class DuplicateDetector(QObject):
+    """Keeps a NearDuplicateIndex on its own thread and reports what changes.
+    
+    add(), remove() and reset() may be called from the GUI thread; they are
+    queued to the detector thread. changed(generation, changes) fires with
+    {path: original or None} for every image whose duplicate status changed.
+    """
+    
+    changed = pyqtSignal(int, dict)
+    _added = pyqtSignal(str, object, int)
+    _removed = pyqtSignal(str)
+    _reset = pyqtSignal(int)
+    
+    def __init__(self, threshold: int = DUPLICATE_HASH_THRESHOLD):
+        super().__init__()
+        self.threshold = threshold
+        self._index = NearDuplicateIndex(threshold)
+        self._generation = 0
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._added.connect(self._on_added)
+        self._removed.connect(self._on_removed)
+        self._reset.connect(self._on_reset)
+        self._thread.start()
+    
+    def add(self, path: str, value: int, order: int):
+        self._added.emit(path, value, order)
+    
+    def remove(self, path: str):
+        self._removed.emit(path)
+    
+    def reset(self, generation: int):
+        """Forget every image; later changes are reported under the new generation."""
+        self._reset.emit(generation)
+    
+    def stop(self):
+        """Finish queued work and end the detector thread. Call from the GUI thread."""
+        self._thread.quit()
+        self._thread.wait()
+    
+    def _on_added(self, path: str, value: int, order: int):
+        changes = self._index.add(path, value, order)
+        if changes:
+            self.changed.emit(self._generation, changes)
+    
+    def _on_removed(self, path: str):
+        changes = self._index.remove(path)
+        if changes:
+            self.changed.emit(self._generation, changes)
+    
+    def _on_reset(self, generation: int):
+        self._index = NearDuplicateIndex(self.threshold)
+        self._generation = generation
+
+
+class ImageHashWorker(QThread):
+    """Computes perceptual hashes for a batch of images off the GUI thread."""
+    
+    hashed = pyqtSignal(str, object)  # path, hash (may exceed 32 bits)
+    
+    def __init__(self, image_paths: List[str], parent=None):
+        super().__init__(parent)
+        self.image_paths = image_paths
+    
+    def run(self):
+        pool = get_process_pool()
+        futures = {pool.submit(perceptual_hash, path): path for path in self.image_paths}
+        for future in as_completed(futures):
+            try:
+                self.hashed.emit(futures[future], future.result())
+            except Exception:
+                continue  # Unreadable images are simply never deduplicated
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# IMAGE IMPORT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# File signatures of the image formats we accept, so files are judged by content, not name
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', "PNG"),
+    (b'\xff\xd8\xff', "JPEG"),
+    (b'GIF87a', "GIF"),
+    (b'GIF89a', "GIF"),
+    (b'BM', "BMP"),
+)
+# "BM" alone matches plenty of text files, so BMPs must also carry a known DIB header size
+BMP_DIB_HEADER_SIZES = (12, 16, 40, 52, 56, 64, 108, 124)
+IMAGE_SIGNATURE_BYTES = 18  # Through the BMP DIB header size
+IMAGE_SCAN_BATCH = 256  # Images per found() batch from a scan
+IMAGE_SCAN_BATCH_SECONDS = 0.25
+
+
+def sniff_image_format(path: str) -> Optional[str]:
+    """Return the image format named by the file's magic bytes, or None."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(IMAGE_SIGNATURE_BYTES)
+    except OSError:
+        return None
+    fmt = next((fmt for signature, fmt in IMAGE_SIGNATURES if header.startswith(signature)), None)
+    if fmt == "BMP":
+        dib_header_size = int.from_bytes(header[14:18], 'little') if len(header) >= 18 else 0
+        if dib_header_size not in BMP_DIB_HEADER_SIZES:
+            return None
+    return fmt
+
+
+class ImageScanWorker(QThread):
+    """Checks dropped files and recursively scans dropped folders off the GUI thread.
+    
+    Images arrive in batches through found(), in drop order with each folder
+    in sorted path order. Dropped files that aren't images end up in rejected.
+    """
+    
+    found = pyqtSignal(list)  # Image paths
+    
+    def __init__(self, paths: List[str], parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.label = Path(paths[0]).name if len(paths) == 1 else f"{len(paths)} items"
+        self.scanned = 0  # Files examined
+        self.rejected: List[str] = []  # Names of dropped files that aren't images
+        self._batch = []
+        self._last_emit = 0.0
+        self._cancel_event = threading.Event()
+    
+    def cancel(self):
+        self._cancel_event.set()
+    
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+    
+    def run(self):
+        self._last_emit = time.monotonic()
+        for path in self.paths:
+            if self.is_cancelled():
+                return
+            if os.path.isdir(path):
+                self._scan_folder(path)
+            elif self._check(path) is None:
+                self.rejected.append(Path(path).name)
+        if self._batch and not self.is_cancelled():
+            self.found.emit(self._batch)
+    
+    def _check(self, path: str) -> Optional[str]:
+        """Sniff one file, queueing it for found() if it's an image."""
+        self.scanned += 1
+        fmt = sniff_image_format(path)
+        if fmt:
+            self._batch.append(path)
+        if self._batch and (len(self._batch) >= IMAGE_SCAN_BATCH
+                            or time.monotonic() - self._last_emit >= IMAGE_SCAN_BATCH_SECONDS):
+            self.found.emit(self._batch)
+            self._batch = []
+            self._last_emit = time.monotonic()
+        return fmt
+    
+    def _scan_folder(self, folder: str):
+        stack = [folder]
+        while stack and not self.is_cancelled():
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue  # Unreadable directory
+            subdirectories = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.'):
+                            subdirectories.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                self._check(entry.path)
+            stack.extend(reversed(subdirectories))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DOCUMENT PARSING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+DOCUMENT_EXTENSIONS = {'.pdf', '.docx', '.txt', '.md'}
+PDF_PAGES_PER_TASK = 16  # Minimum pages per process pool task (each task re-opens the file)
+PDF_PARALLEL_MIN_PAGES = 32  # Smaller PDFs aren't worth the process start-up
+CACHED_DOCUMENT_EXTENSIONS = {'.pdf', '.docx'}  # Plain text is as fast to re-read as to cache
+TEXT_SAMPLE_BYTES = 64 * 1024  # Read through mmap for encoding detection and the preview
+TEXT_PREVIEW_CHARS = 2000
+TEXT_LAZY_MIN_BYTES = 8 * 1024 * 1024  # Larger text files are only read when generating
+TEXT_READ_BLOCK_BYTES = 1024 * 1024
+
+
+class ParseCancelled(Exception):
+    """Raised when a document parse is superseded by a newer drop."""
+
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> List[tuple]:
+    """Extract pages [start, stop) as (text, error) pairs. Runs in a worker process."""
+    results = []
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for index in range(start, stop):
+            try:
+                results.append((reader.pages[index].extract_text() or "", None))
+            except Exception as e:
+                results.append(("", f"{type(e).__name__}: {e}"))
+    return results
+
+
+def read_pdf(path: str, progress_callback=None, is_cancelled=None) -> dict:
+    """Extract text from PDF, spreading page ranges across the process pool.
+    
+    Each task opens the file itself; results are reassembled in page order.
+    progress_callback(pages_done, total_pages) is called as ranges finish.
+    """
+    with open(path, 'rb') as f:
+        total = len(PyPDF2.PdfReader(f).pages)
+    workers = os.cpu_count() or 1
+    # About two ranges per core keeps cores busy without re-parsing the file too often
+    per_task = max(PDF_PAGES_PER_TASK, math.ceil(total / (workers * 2)))
+    ranges = [(start, min(start + per_task, total)) for start in range(0, total, per_task)]
+    pages: List[Optional[tuple]] = [None] * total
+    done = 0
+    
+    def store(start: int, results: List[tuple]):
+        nonlocal done
+        pages[start:start + len(results)] = results
+        done += len(results)
+        if progress_callback:
+            progress_callback(done, total)
+    
+    if total < PDF_PARALLEL_MIN_PAGES or workers < 2:
+        for start, stop in ranges:
+            if is_cancelled and is_cancelled():
+                raise ParseCancelled()
+            store(start, _extract_pdf_pages(path, start, stop))
+    else:
+        pool = get_process_pool()
+        futures = {pool.submit(_extract_pdf_pages, path, start, stop): start for start, stop in ranges}
+        try:
+            for future in as_completed(futures):
+                if is_cancelled and is_cancelled():
+                    raise ParseCancelled()
+                store(futures[future], future.result())
+        finally:
+            # No-op for finished ranges; frees the pool after a cancel or failure
+            for future in futures:
+                future.cancel()
+    
+    page_offsets = []
+    position = 0
+    for text, _ in pages:
+        page_offsets.append(position)
+        if text:
+            position += len(text) + 1
+    
+    return {
+        "text": '\n'.join(text for text, _ in pages if text),
+        "pages": total,
+        "page_offsets": page_offsets,
+        "empty_pages": [number for number, (text, error) in enumerate(pages, 1) if not text and not error],
+        "failed_pages": {number: error for number, (_, error) in enumerate(pages, 1) if error},
+    }
+
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+HEADING_STYLE_PATTERN = re.compile(r'^(?:heading\s*(\d)|title)$', re.IGNORECASE)
+
+
+def _docx_main_part(archive: zipfile.ZipFile) -> str:
+    """Name of the main document part (normally word/document.xml)."""
+    try:
+        relationships = ElementTree.fromstring(archive.read("_rels/.rels"))
+    except (KeyError, ElementTree.ParseError):
+        return "word/document.xml"
+    for relationship in relationships:
+        if relationship.get("Type", "").endswith("/officeDocument"):
+            return relationship.get("Target", "word/document.xml").lstrip("/")
+    return "word/document.xml"
+
+
+def _docx_paragraph_text(paragraph) -> str:
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == WORD_NS + "t":
+            parts.append(node.text or "")
+        elif node.tag == WORD_NS + "tab":
+            parts.append("\t")
+        elif node.tag in (WORD_NS + "br", WORD_NS + "cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _docx_heading_level(paragraph) -> int:
+    """Heading level from the paragraph style or outline level, 0 for body text."""
+    properties = paragraph.find(WORD_NS + "pPr")
+    if properties is None:
+        return 0
+    style = properties.find(WORD_NS + "pStyle")
+    if style is not None:
+        match = HEADING_STYLE_PATTERN.match(style.get(WORD_NS + "val", ""))
+        if match:
+            return int(match.group(1) or 1)
+    outline = properties.find(WORD_NS + "outlineLvl")
+    if outline is not None and outline.get(WORD_NS + "val", "").isdigit():
+        return min(int(outline.get(WORD_NS + "val")) + 1, 6)
+    return 0
+
+
+def read_docx(path: str) -> str:
+    """Extract paragraphs, headings and table rows from DOCX in document order.
+    
+    Streams the document XML with iterparse and discards each element once
+    handled, so memory is bounded by the largest table row rather than the
+    file. Headings become Markdown headings and table rows "| a | b |" lines.
+    """
+    lines = []
+    cells = []  # Paragraph texts of each open table cell (nested tables stack)
+    rows = []  # Cell texts of each open table row
+    body = None
+    
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(_docx_main_part(archive)) as xml:
+            for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == WORD_NS + "body":
+                        body = elem
+                    elif tag == WORD_NS + "tc":
+                        cells.append([])
+                    elif tag == WORD_NS + "tr":
+                        rows.append([])
+                    continue
+                
+                if tag == WORD_NS + "p":
+                    text = _docx_paragraph_text(elem).strip()
+                    if text:
+                        if cells:
+                            cells[-1].append(text)
+                        else:
+                            level = _docx_heading_level(elem)
+                            lines.append(f"{'#' * level} {text}" if level else text)
+                elif tag == WORD_NS + "tc" and cells:
+                    cell = " ".join(cells.pop()).replace("|", "/")
+                    if rows:
+                        rows[-1].append(cell)
+                elif tag == WORD_NS + "tr" and rows:
+                    row = rows.pop()
+                    if any(row) and cells:
+                        # Rows of a nested table become text of the enclosing cell
+                        cells[-1].append("; ".join(cell for cell in row if cell))
+                    elif any(row):
+                        lines.append("| " + " | ".join(row) + " |")
+                else:
+                    continue
+                
+                elem.clear()
+                if body is not None and not cells and not rows:
+                    # Drop finished top-level blocks from the tree
+                    body.clear()
+    
+    return '\n'.join(lines)
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Guess a text file's encoding from its first bytes."""
+    for bom, encoding in ((codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+                          (codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"),
+                          (codecs.BOM_UTF16_BE, "utf-16")):
+        if sample.startswith(bom):
+            return encoding
+    # NUL bytes in every other position without a BOM: UTF-16
+    if sample[1:200:2].count(0) > 50:
+        return "utf-16-le"
+    if sample[:200:2].count(0) > 50:
+        return "utf-16-be"
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            # final=False tolerates a multi-byte character cut off at the end of the sample
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def read_text_sample(path: str) -> tuple:
+    """Memory-map the start of a text file and return (encoding, preview text)."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return "utf-8", ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            sample = mapped[:TEXT_SAMPLE_BYTES]
+    encoding = detect_encoding(sample)
+    preview = codecs.getincrementaldecoder(encoding)(errors="replace").decode(sample, final=False)
+    return encoding, preview
+
+
+def read_text(path: str, encoding: str, progress_callback=None, is_cancelled=None) -> str:
+    """Read a text file block by block through an incremental decoder.
+    
+    Undecodable bytes are replaced instead of failing. The whole text is still
+    returned because the prompt needs it; reading in blocks keeps only one raw
+    block in memory beside the decoded parts and lets a cancel stop the read.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    total = os.path.getsize(path)
+    parts = []
+    done = 0
+    with open(path, 'rb') as f:
+        while True:
+            if is_cancelled and is_cancelled():
+                raise ParseCancelled()
+            block = f.read(TEXT_READ_BLOCK_BYTES)
+            if not block:
+                break
+            parts.append(decoder.decode(block))
+            done += len(block)
+            if progress_callback:
+                progress_callback(done, total)
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
+
+def read_document(path: str, progress_callback=None, is_cancelled=None) -> dict:
+    """Extract a PDF, DOCX, TXT or MD file.
+    
+    Returns {"text", "pages", "page_offsets", "empty_pages", "failed_pages",
+    "sections"}; page details are only filled in for PDFs, and sections lists
+    [offset, heading] for each heading found in the text. Large TXT/MD files
+    are not read: "text" is None and "preview"/"encoding" describe the file.
+    """
+    ext = Path(path).suffix.lower()
+    if ext == '.pdf':
+        document = read_pdf(path, progress_callback, is_cancelled)
+        document["sections"] = document_outline(document["text"])
+        return document
+    if ext == '.docx':
+        content = read_docx(path)
+    elif ext in {'.txt', '.md'}:
+        encoding, preview = read_text_sample(path)
+        if os.path.getsize(path) >= TEXT_LAZY_MIN_BYTES:
+            if progress_callback:
+                progress_callback(1, 1)
+            return {"text": None, "preview": preview, "encoding": encoding, "pages": 0,
+                    "page_offsets": [], "empty_pages": [], "failed_pages": {}, "sections": []}
+        content = read_text(path, encoding)
+    else:
+        raise ValueError(f"Unsupported document type: {ext or Path(path).name}")
+    if progress_callback:
+        progress_callback(1, 1)
+    return {"text": content, "pages": 0, "page_offsets": [], "empty_pages": [], "failed_pages": {},
+            "sections": document_outline(content)}
+
+
+def document_outline(text: str) -> List[list]:
+    """[offset, heading] for every heading in the text."""
+    return [[m.start(), m.group(0).strip()] for m in HEADING_PATTERN.finditer(text)]
+
+
+def describe_page_issues(document: dict) -> str:
+    """Summarise PDF pages that produced no text or failed to extract."""
+    def page_list(numbers):
+        shown = ", ".join(str(n) for n in numbers[:10])
+        return shown + (f" and {len(numbers) - 10} more" if len(numbers) > 10 else "")
+    
+    notes = []
+    if document["empty_pages"]:
+        notes.append(f"{len(document['empty_pages'])} page(s) without text ({page_list(document['empty_pages'])})")
+    if document["failed_pages"]:
+        failed = sorted(document["failed_pages"])
+        notes.append(f"{len(failed)} page(s) failed ({page_list(failed)})")
+    return " • ".join(notes)
+
+
+class DocumentParseWorker(QThread):
+    """Extracts document text off the GUI thread."""
+    
+    progress = pyqtSignal(int, int)  # units done (pages for PDFs), total units
+    parsed = pyqtSignal(str, object)  # path, read_document() result
+    failed = pyqtSignal(str, str)  # path, error message
+    
+    def __init__(self, path: str, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self._cancel_event = threading.Event()
+    
+    def cancel(self):
+        """Stop at the next page; no signal is emitted once cancelled."""
+        self._cancel_event.set()
+    
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+    
+    def run(self):
+        try:
+            cacheable = Path(self.path).suffix.lower() in CACHED_DOCUMENT_EXTENSIONS
+            document = DOCUMENT_CACHE.load(self.path) if cacheable else None
+            if document is not None:
+                document["from_cache"] = True
+                self.progress.emit(1, 1)
+            elif not cacheable:
+                document = read_document(self.path, self.progress.emit, self.is_cancelled)
+            else:
+                # Identity and hash are taken first so an edit during parsing isn't cached as current
+                identity_key = DOCUMENT_CACHE.identity_key(self.path)
+                content_hash = file_sha256(self.path)
+                document = read_document(self.path, self.progress.emit, self.is_cancelled)
+                try:
+                    DOCUMENT_CACHE.store(identity_key, content_hash, document)
+                except OSError:
+                    pass  # Caching is best effort
+        except ParseCancelled:
+            return
+        except Exception as e:
+            if not self.is_cancelled():
+                self.failed.emit(self.path, str(e))
+            return
+        if self.is_cancelled():
+            return
+        if document["text"]:
+            # Index at ingestion so focused prompts don't re-split the document per run
+            document["index"] = SectionIndex(document["text"])
+        self.parsed.emit(self.path, document)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DOCUMENT CHUNKING & SUITE MERGING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+DOCUMENT_CHUNK_CHARS = 60_000  # ~15k tokens of document text per request
+CHUNK_CONCURRENCY = 4
+
+# Markdown headings, numbered headings ("3.2 Login Flow") and short ALL-CAPS lines
+HEADING_PATTERN = re.compile(
+    r'^(?:#{1,6}[ \t]+\S.*|(?:\d+\.)+\d*[ \t]+[A-Z].{0,80}|[A-Z][A-Z0-9 /&()\-]{3,60})[ \t]*$',
+    re.MULTILINE
+)
+TEST_CASE_BLOCK_PATTERN = re.compile(
+    r'(?:^─+[ \t]*\n)?^[ \t]*TEST CASE ID:.*?(?=^─+[ \t]*\n[ \t]*TEST CASE ID:|^[ \t]*TEST CASE ID:|^═+|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+SUITE_DIVIDER = "═" * 78
+TEST_CASE_ID_PATTERN = re.compile(r'(TEST CASE ID:\s*)TC-(\d+)')
+SUITE_TITLE_PATTERN = re.compile(r'^\s*TEST SUITE:\s*(.+?)\s*$', re.MULTILINE)
+
+
+def split_sections(text: str) -> List[str]:
+    """Split a document at headings and page breaks, keeping each heading with its body."""
+    boundaries = {0}
+    boundaries.update(m.start() for m in HEADING_PATTERN.finditer(text))
+    boundaries.update(m.end() for m in re.finditer(r'\f', text))
+    points = sorted(boundaries) + [len(text)]
+    sections = [text[start:end].strip('\f') for start, end in zip(points, points[1:])]
+    return [section for section in sections if section.strip()]
+
+
+def chunk_document(text: str, max_chars: int = DOCUMENT_CHUNK_CHARS) -> List[str]:
+    """Pack document sections into chunks of at most max_chars characters.
+    
+    Sections larger than a chunk are split at paragraph, then line boundaries.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    
+    pieces = []
+    for section in split_sections(text):
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+        for paragraph in re.split(r'\n\s*\n', section):
+            while len(paragraph) > max_chars:
+                cut = paragraph.rfind('\n', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(paragraph[:cut])
+                paragraph = paragraph[cut:]
+            pieces.append(paragraph)
+    
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def extract_test_case_blocks(text: str) -> List[str]:
+    """Return the individual test case blocks from a generated suite."""
+    return [m.group(0).rstrip() for m in TEST_CASE_BLOCK_PATTERN.finditer(text)]
+
+
+def _normalized_test_case_name(block: str) -> str:
+    match = re.search(r'TEST CASE NAME:\s*(.+)', block)
+    name = match.group(1) if match else block
+    return re.sub(r'[^a-z0-9]+', ' ', name.lower()).strip()
+
+
+def merge_test_suites(suites: List[str], title: str, start_number: int = 1) -> str:
+    """Merge generated suites into one, dropping duplicate test cases and renumbering TC IDs.
+    
+    Output that doesn't follow the test case format is appended unchanged.
+    """
+    blocks = []
+    seen = set()
+    unparsed = []
+    for suite in suites:
+        suite_blocks = extract_test_case_blocks(suite)
+        if not suite_blocks and suite.strip():
+            unparsed.append(suite.strip())
+        for block in suite_blocks:
+            name = _normalized_test_case_name(block)
+            if name in seen:
+                continue
+            seen.add(name)
+            blocks.append(block)
+    
+    numbered = [
+        TEST_CASE_ID_PATTERN.sub(rf'\g<1>TC-{number:03d}', _with_divider(block), count=1)
+        for number, block in enumerate(blocks, start_number)
+    ]
+    return format_test_suite(numbered + unparsed, title)
+
+
+def _with_divider(block: str) -> str:
+    return block if block.startswith("─") else "─" * 78 + "\n" + block
+
+
+def format_test_suite(parts: List[str], title: str) -> str:
+    """Lay out test case blocks (and any free text) under a suite header."""
+    title_line = f"{'TEST SUITE: ' + title:^78}".rstrip()
+    header = f"{SUITE_DIVIDER}\n{title_line}\n{SUITE_DIVIDER}"
+    body = "\n\n".join(parts)
+    return f"{header}\n\n{body}\n\n{SUITE_DIVIDER}\n"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TOKEN ESTIMATION & BUDGETING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+IMAGE_TOKEN_ESTIMATE = 258  # Gemini bills a standard image (or 768px tile) at ~258 tokens
+VIDEO_TOKENS_PER_SECOND = 263
+DEFAULT_VIDEO_SECONDS = 60
+EXPECTED_OUTPUT_TOKENS = 4096  # A 10-15 test case suite
+INPUT_TOKENS_PER_SECOND = 20_000
+OUTPUT_TOKENS_PER_SECOND = 150
+BASE_LATENCY_SECONDS = 2.0
+TOKEN_BUDGET_OPTIONS = [("256,000 tokens", 256_000), ("128,000 tokens", 128_000),
+                        ("32,000 tokens", 32_000), ("1,000,000 tokens (model max)", 1_000_000),
+                        ("No limit", 0)]
+IMAGE_TRIM_EDGES = (1024, 768, 512)  # Resolutions tried, in order, when over budget
+MIN_DOCUMENT_TOKENS = 2_000  # Trimming never cuts the document below this
+PREFLIGHT_COUNT_MARGIN = 0.2  # Estimates within 20% of the budget are checked with count_tokens
+
+# Matched against a whole heading, after markdown marks and section numbers
+LOW_VALUE_SECTION_PATTERN = re.compile(
+    r'^\W*(?:(?:\d+\.)*\d*\.?\s+)?'
+    r'(?:(?:table of )?contents|revision history|change ?log|document history|glossary(?: of terms)?|'
+    r'references|bibliography|acknowledge?ments?|index|appendix\b.*|copyright\b.*)\W*$',
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for text (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def estimate_image_tokens(data: bytes) -> int:
+    """Tokens for an inline image: small images cost one unit, larger ones one per 768px tile."""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
+    except Exception:
+        return IMAGE_TOKEN_ESTIMATE
+    if width <= 384 and height <= 384:
+        return IMAGE_TOKEN_ESTIMATE
+    return math.ceil(width / 768) * math.ceil(height / 768) * IMAGE_TOKEN_ESTIMATE
+
+
+def estimate_content_tokens(content: list, video_seconds: Optional[float] = None) -> int:
+    """Local token estimate for a request's content parts."""
+    total = 0
+    for part in content:
+        if isinstance(part, str):
+            total += estimate_tokens(part)
+        elif isinstance(part, dict) and "data" in part:
+            total += estimate_image_tokens(part["data"])
+        else:
+            # Uploaded video file
+            total += int(VIDEO_TOKENS_PER_SECOND * (video_seconds or DEFAULT_VIDEO_SECONDS))
+    return total
+
+
+def estimate_latency(input_tokens: int, output_tokens: int) -> float:
+    """Approximate seconds for one request of the given size."""
+    return (BASE_LATENCY_SECONDS + input_tokens / INPUT_TOKENS_PER_SECOND
+            + output_tokens / OUTPUT_TOKENS_PER_SECOND)
+
+
+def format_preflight(preflight: dict) -> str:
+    """One-line summary of a pre-flight estimate."""
+    text = (f"≈ {preflight['input_tokens']:,} input tokens ({preflight['method']}) • "
+            f"~{preflight['output_tokens']:,} output • ~{preflight['latency']:.0f}s")
+    if preflight["requests"] > 1:
+        text += f" • {preflight['requests']} requests"
+    if preflight["trimmed"]:
+        text += " • trimmed: " + ", ".join(preflight["trimmed"])
+    return text
+
+
+def trim_document(text: str, max_tokens: int) -> str:
+    """Cut a document down to about max_tokens.
+    
+    Boilerplate sections (table of contents, revision history, glossary,
+    appendices...) are dropped first, then sections from the end.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    sections = split_sections(text)
+    sizes = [estimate_tokens(section) for section in sections]
+    total = sum(sizes)
+    
+    low_value = [i for i in reversed(range(len(sections)))
+                 if LOW_VALUE_SECTION_PATTERN.search(sections[i].lstrip().split('\n', 1)[0])]
+    drop_order = low_value + [i for i in reversed(range(len(sections))) if i not in low_value]
+    dropped = set()
+    for index in drop_order:
+        if total <= max_tokens:
+            break
+        dropped.add(index)
+        total -= sizes[index]
+    
+    kept = [section for i, section in enumerate(sections) if i not in dropped]
+    if not kept:
+        # One oversized section - fall back to a hard cut
+        return text[:max(max_tokens, 0) * 4] + "\n\n[Document truncated to fit the token budget]"
+    return "\n\n".join(kept) + f"\n\n[{len(dropped)} section(s) omitted to fit the token budget]"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION RETRIEVAL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+RETRIEVAL_TOKEN_BUDGET = 16_000  # Document tokens sent when focusing on the app context
+BM25_K1 = 1.5
+BM25_B = 0.75
+HEADING_TERM_WEIGHT = 3  # Heading words count as this many body occurrences
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have if in into is it its of on or should shall "
+    "that the their then there these this to was were will with when which who must may not no "
+    "all any each user users app application screen test testing tests".split()
+)
+
+# Extra query terms per test type, so e.g. security runs pull in auth and permission sections
+TEST_TYPE_KEYWORDS = {
+    "Functional Testing": "",
+    "UI/UX Testing": "ui ux layout design button display navigation visual theme",
+    "Integration Testing": "integration api server backend sync service notification third party",
+    "Performance Testing": "performance latency load response time memory battery network offline",
+    "Security Testing": "security authentication authorization password encryption token session permission privacy",
+    "Accessibility Testing": "accessibility talkback screen reader contrast font size label focus",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word terms for lexical search, without stopwords."""
+    return [term for term in re.findall(r'[a-z0-9]+', text.lower())
+            if len(term) > 1 and term not in STOPWORDS]
+
+
+class SectionIndex:
+    """BM25 index over a document's sections (split at headings and page breaks)."""
+    
+    def __init__(self, text: str):
+        self.sections = split_sections(text)
+        self._term_freqs: List[Counter] = []
+        self._lengths: List[int] = []
+        document_freq = Counter()
+        for section in self.sections:
+            heading, _, body = section.partition('\n')
+            terms = tokenize(body) + tokenize(heading) * HEADING_TERM_WEIGHT
+            freqs = Counter(terms)
+            self._term_freqs.append(freqs)
+            self._lengths.append(len(terms))
+            document_freq.update(freqs.keys())
+        
+        count = len(self.sections)
+        self._avg_length = (sum(self._lengths) / count) if count else 1.0
+        self._idf = {
+            term: math.log(1 + (count - freq + 0.5) / (freq + 0.5))
+            for term, freq in document_freq.items()
+        }
+    
+    def scores(self, query: str) -> List[float]:
+        """BM25 score of every section for the query."""
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        results = []
+        for freqs, length in zip(self._term_freqs, self._lengths):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (self._avg_length or 1.0))
+            score = 0.0
+            for term in terms:
+                tf = freqs.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+    
+    def select(self, query: str, max_tokens: int = RETRIEVAL_TOKEN_BUDGET) -> Optional[tuple]:
+        """Top-ranked sections for the query, in document order, within max_tokens.
+        
+        Returns (text, sections_kept) or None when nothing matches the query.
+        """
+        scores = self.scores(query)
+        ranked = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+        if not ranked:
+            return None
+        
+        chosen = []
+        used = 0
+        for index in ranked:
+            size = estimate_tokens(self.sections[index])
+            if used + size > max_tokens:
+                continue
+            chosen.append(index)
+            used += size
+        if not chosen:
+            # Even the best section is over budget - send its beginning
+            best = self.sections[ranked[0]][:max_tokens * 4]
+            return f"[Most relevant section, truncated]\n\n{best}", 1
+        
+        parts = [f"[{len(chosen)} of {len(self.sections)} sections most relevant to: {query.strip()}]"]
+        previous = None
+        for index in sorted(chosen):
+            if previous is not None and index != previous + 1:
+                parts.append("[...]")
+            parts.append(self.sections[index])
+            previous = index
+        return "\n\n".join(parts), len(chosen)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INCREMENTAL REGENERATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+SUITE_HISTORY_VERSION = 1  # Bump when the fingerprint or attribution scheme changes
+REVISED_SECTIONS_NOTE = (
+    "[Added or changed sections of a revised document. Test cases for the rest of the "
+    "document already exist - only write test cases for requirements covered here.]"
+)
+
+
+def section_fingerprint(section: str) -> str:
+    """Hash of a section's text, ignoring whitespace and reflow differences."""
+    return hashlib.sha256(" ".join(section.split()).encode('utf-8')).hexdigest()[:20]
+
+
+def attribute_test_cases(blocks: List[str], index: SectionIndex,
+                         candidates: Optional[List[int]] = None) -> List[Optional[int]]:
+    """Index of the section each test case most likely covers, by BM25 over the case text.
+    
+    Only sections in candidates are considered when given. None means no section matched.
+    """
+    attributed = []
+    for block in blocks:
+        scores = index.scores(block)
+        pool = candidates if candidates is not None else range(len(scores))
+        best = max(pool, key=lambda i: scores[i], default=None)
+        attributed.append(best if best is not None and scores[best] > 0 else None)
+    return attributed
+
+
+class SuiteHistory:
+    """The last suite generated from each document, with its sections' fingerprints.
+    
+    Each test case is stored against the section it was attributed to, so a
+    revised document only needs new test cases for added or changed sections.
+    """
+    
+    def __init__(self, history_dir: Path, max_bytes: int = 50 * 1024 * 1024):
+        self._store = JsonStore(history_dir, max_bytes, compress=True)
+    
+    @staticmethod
+    def suite_key(document_path: str, test_type: str, app_context: str, model_name: str) -> str:
+        identity = f"{Path(document_path).resolve()}|{test_type}|{app_context.strip()}|{model_name}"
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+    
+    def load(self, key: str) -> Optional[dict]:
+        """Return the recorded suite for key, or None when absent or from an older format."""
+        entry = self._store.get(key)
+        if entry is None or entry.get("version") != SUITE_HISTORY_VERSION:
+            return None
+        return entry
+    
+    def record(self, key: str, document: str, suite: str, index: Optional[SectionIndex] = None):
+        """Store a generated suite against the sections of the document it came from."""
+        index = index or SectionIndex(document)
+        fingerprints = [section_fingerprint(section) for section in index.sections]
+        blocks = extract_test_case_blocks(suite)
+        title = SUITE_TITLE_PATTERN.search(suite)
+        self._store.put(key, {
+            "version": SUITE_HISTORY_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "title": title.group(1) if title else None,
+            "sections": fingerprints,
+            "cases": [
+                {"section": fingerprints[section] if section is not None else None, "block": block}
+                for block, section in zip(blocks, attribute_test_cases(blocks, index))
+            ],
+        })
+
+
+SUITE_HISTORY = SuiteHistory(APP_DATA_DIR / "suite_history")
+
+
+def plan_incremental(previous: dict, sections: List[str]) -> Optional[dict]:
+    """Diff a document's sections against a recorded suite.
+    
+    Returns the test cases to reuse (as (section position, block) pairs), the
+    positions of added or changed sections and the number of dropped sections,
+    or None when no section is unchanged.
+    """
+    fingerprints = [section_fingerprint(section) for section in sections]
+    recorded = set(previous["sections"])
+    changed = [i for i, fingerprint in enumerate(fingerprints) if fingerprint not in recorded]
+    if len(changed) == len(sections):
+        return None
+    
+    position = {fingerprint: i for i, fingerprint in enumerate(fingerprints)}
+    reused = []
+    retired_ids = {}  # Test case name -> TC ID, for cases of changed or dropped sections
+    for case in previous["cases"]:
+        if case["section"] is None:
+            reused.append((len(sections), case["block"]))  # Unattributed - keep, listed last
+        elif case["section"] in position:
+            reused.append((position[case["section"]], case["block"]))
+        else:
+            match = TEST_CASE_ID_PATTERN.search(case["block"])
+            if match:
+                retired_ids[_normalized_test_case_name(case["block"])] = int(match.group(2))
+    return {
+        "reused": reused,
+        "retired_ids": retired_ids,
+        "changed": changed,
+        "removed": len(recorded - set(fingerprints)),
+        "sections": len(sections),
+        "title": previous.get("title"),
+    }
+
+
+def merge_incremental(plan: dict, result: str, index: SectionIndex, title: str) -> str:
+    """Merge new test cases for changed sections into the reused ones.
+    
+    Reused test cases keep their TC IDs, as do regenerated ones whose name is
+    unchanged; new ones are numbered after the highest previous ID. Test cases
+    are ordered by the section they cover.
+    """
+    reused_names = {_normalized_test_case_name(block) for _, block in plan["reused"]}
+    next_id = max(plan["retired_ids"].values(), default=0) + 1
+    for _, block in plan["reused"]:
+        match = TEST_CASE_ID_PATTERN.search(block)
+        if match:
+            next_id = max(next_id, int(match.group(2)) + 1)
+    
+    blocks = extract_test_case_blocks(result)
+    unparsed = [result.strip()] if not blocks and result.strip() else []
+    placed = list(plan["reused"])
+    for block, section in zip(blocks, attribute_test_cases(blocks, index, plan["changed"])):
+        name = _normalized_test_case_name(block)
+        if name in reused_names:
+            continue
+        reused_names.add(name)
+        number = plan["retired_ids"].get(name)
+        if number is None:
+            number = next_id
+            next_id += 1
+        block = TEST_CASE_ID_PATTERN.sub(rf'\g<1>TC-{number:03d}', block, count=1)
+        placed.append((section if section is not None else plan["changed"][-1], block))
+    
+    # sorted() is stable, so cases within a section keep their existing order
+    ordered = [_with_divider(block) for _, block in sorted(placed, key=lambda item: item[0])]
+    return format_test_suite(ordered + unparsed, plan.get("title") or title)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PROGRESS TRACKING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Pipeline stages: (status label, share of the progress bar by weight)
+PROGRESS_STAGES = {
+    "prepare": ("Preparing", 5),
+    "encode": ("Encoding images", 10),
+    "keyframes": ("Extracting keyframes", 25),
+    "upload": ("Uploading video", 25),
+    "process": ("Processing video", 10),
+    "preflight": ("Estimating request", 5),
+    "generate": ("Generating", 60),
+}
+PROGRESS_STATUS_INTERVAL = 0.5  # Seconds between status line updates
+PROGRESS_STALL_SECONDS = 15  # Flag a stage that stopped reporting work for this long
+
+
+class ProgressTracker:
+    """Turns measured work per pipeline stage into progress, elapsed time and an ETA.
+    
+    Each planned stage owns a slice of the 0-100 bar proportional to its
+    weight. Within a stage, progress is the measured fraction of work done
+    (bytes, frames, tokens, requests); stages started with expected_seconds
+    also advance with time while waiting on the API. Thread-safe.
+    """
+    
+    def __init__(self, stages: List[str], on_progress, on_status):
+        self._on_progress = on_progress
+        self._on_status = on_status
+        total_weight = sum(PROGRESS_STAGES[stage][1] for stage in stages)
+        self._spans = {}
+        start = 0.0
+        for stage in stages:
+            share = 100.0 * PROGRESS_STAGES[stage][1] / total_weight
+            self._spans[stage] = (start, share)
+            start += share
+        
+        self._lock = threading.Lock()
+        self._stage: Optional[str] = None
+        self._value = 0
+        self._fraction = 0.0
+        self._detail = ""
+        self._expected: Optional[float] = None
+        self._measured = False
+        self._started = self._last_data = self._last_status = time.monotonic()
+    
+    def start(self, stage: str, detail: str = "", expected_seconds: Optional[float] = None):
+        """Enter a stage; stages not in the plan are ignored."""
+        with self._lock:
+            if stage not in self._spans:
+                return
+            self._stage = stage
+            self._fraction = 0.0
+            self._detail = detail
+            self._expected = expected_seconds
+            self._measured = False
+            self._started = self._last_data = time.monotonic()
+            self._emit(force=True)
+    
+    def update(self, fraction: float, detail: str = ""):
+        """Report measured work for the current stage (0.0-1.0)."""
+        with self._lock:
+            if self._stage is None:
+                return
+            self._fraction = max(self._fraction, min(fraction, 1.0))
+            if detail:
+                self._detail = detail
+            self._measured = True
+            self._last_data = time.monotonic()
+            self._emit()
+    
+    def tick(self):
+        """Refresh time-based progress and the status line while waiting."""
+        with self._lock:
+            if self._stage is None:
+                return
+            if self._expected:
+                elapsed = time.monotonic() - self._started
+                self._fraction = max(self._fraction, min(0.95, elapsed / self._expected))
+            self._emit()
+    
+    def finish(self):
+        with self._lock:
+            self._value = 100
+            self._on_progress(100)
+    
+    def _emit(self, force: bool = False):
+        start, share = self._spans[self._stage]
+        value = int(start + share * self._fraction)
+        if value > self._value:
+            self._value = value
+            self._on_progress(value)
+        
+        now = time.monotonic()
+        if not force and now - self._last_status < PROGRESS_STATUS_INTERVAL:
+            return
+        self._last_status = now
+        
+        elapsed = now - self._started
+        parts = [PROGRESS_STAGES[self._stage][0]]
+        if self._detail:
+            parts.append(self._detail)
+        parts.append(f"{elapsed:.0f}s elapsed")
+        if self._expected and elapsed > self._expected and self._fraction < 1.0:
+            parts.append("taking longer than expected")
+        elif 0.0 < self._fraction < 1.0 and elapsed >= 1.0:
+            parts.append(f"~{elapsed * (1.0 - self._fraction) / self._fraction:.0f}s left")
+        if self._measured and now - self._last_data > PROGRESS_STALL_SECONDS:
+            parts.append(f"no data for {now - self._last_data:.0f}s")
+        self._on_status(" • ".join(parts))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GEMINI API WORKER THREAD
+# ═══════════════════════════════════════════════════════════════════════════════
+
+CANCEL_POLL_INTERVAL = 0.2  # Seconds between cancellation checks while waiting on the API
+COUNT_TOKENS_TIMEOUT = 15.0  # Pre-flight falls back to a local estimate after this
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a GeminiWorker once cancel() has been called."""
+
+
+# Fan-out runs one request per test type concurrently and merges the results
+FAN_OUT_LABEL = "All Types in Parallel (Merged Suite)"
+FAN_OUT_TEST_TYPES = [
+    "Functional Testing",
+    "UI/UX Testing",
+    "Integration Testing",
+    "Performance Testing",
+    "Security Testing",
+    "Accessibility Testing"
+]
+
+
+class GeminiWorker(QThread):
+    """Background worker for Gemini API calls."""
+    
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(int)
+    chunk_received = pyqtSignal(str, str)  # Section ("" for the whole suite), partial text while streaming
+    stream_restarted = pyqtSignal(str)  # Section whose partial streamed text is discarded before a retry
+    status_message = pyqtSignal(str)
+    preflight_ready = pyqtSignal(object)  # dict with token/latency estimates, see _preflight
+    cancelled = pyqtSignal()  # Emitted instead of finished/error after cancel()
+    
+    def __init__(self, api_key: str, image_paths: List[str], document_content: Optional[str],
+                 video_path: Optional[str], test_type: str, app_context: str, input_mode: str,
+                 stream: bool = False, use_cache: bool = True, hedge: bool = False,
+                 retry_policy: Optional[RetryPolicy] = None, image_max_edge: int = 1536,
+                 image_hashes: Optional[dict] = None, dedupe_threshold: Optional[int] = None,
+                 video_ingest: str = "upload", chunked: bool = False,
+                 token_budget: int = 0, dry_run: bool = False, context_cache: bool = False,
+                 fan_out: Optional[List[str]] = None, document_path: Optional[str] = None,
+                 document_encoding: str = "utf-8", focus_sections: bool = False,
+                 document_index: Optional["SectionIndex"] = None, history_path: Optional[str] = None,
+                 incremental: bool = False):
+        super().__init__()
+        self.api_key = api_key
+        self.image_paths = image_paths  # Now a list of paths
+        self.document_content = document_content
+        self.document_path = document_path  # Text file read in run() when document_content is None
+        self.document_encoding = document_encoding
+        self.focus_sections = focus_sections  # Send only sections relevant to the app context
+        self.document_index = document_index
+        self.focused_sections = None  # (sections sent, sections in the document) when focused
+        self.history_path = history_path  # Document file the suite history is recorded under
+        self.incremental = incremental  # Only regenerate added or changed sections of a revision
+        self.incremental_plan: Optional[dict] = None
+        self._full_document: Optional[str] = None
+        self._suite_key: Optional[str] = None
+        self.video_path = video_path
+        self.test_type = test_type
+        self.app_context = app_context
+        self.input_mode = input_mode
+        self.stream = stream
+        self.use_cache = use_cache
+        self.from_cache = False
+        self.hedge = hedge
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.attempts: List[dict] = []  # {"attempt", "latency", "error"} per request sent
+        self._partial_output = set()  # Sections with streamed text shown
+        self.image_max_edge = image_max_edge
+        self.image_hashes = dict(image_hashes or {})
+        self.dedupe_threshold = dedupe_threshold  # None disables deduplication
+        self.skipped_duplicates: List[str] = []
+        self.skipped_unreadable: List[str] = []  # Images that could not be decoded
+        self._video_sha256: Optional[str] = None
+        self.video_ingest = video_ingest  # "upload" (full video) or "keyframes"
+        self.keyframe_count = 0
+        self.chunked = chunked  # Map-reduce over document chunks when the document is large
+        self.chunk_count = 0
+        self._image_sha256 = {}
+        self._digest_lock = threading.Lock()
+        self.token_budget = token_budget  # Max input tokens per request, 0 for no limit
+        self.dry_run = dry_run  # Stop after the pre-flight estimate
+        self.preflight: Optional[dict] = None
+        self._trimmed_document: Optional[str] = None
+        self.context_cache = context_cache  # Share the document across test types via a Gemini cache
+        self.cached_context: Optional[str] = None  # Name of the cache used, if any
+        self.created_context = False
+        self.fan_out = list(fan_out or [])  # Test types generated concurrently and merged
+        self._cancel_event = threading.Event()
+        self._open_streams = set()  # Streaming responses to abort on cancel()
+        self._streams_lock = threading.Lock()
+        self._tracker: Optional[ProgressTracker] = None
+        self.charge_request = lambda: None  # Set by the scheduler to charge unplanned requests
+        self.acquire_request = lambda: None  # Set by the scheduler; waits for rate budget for a planned request
+        self._prepaid_request = threading.Semaphore(1)  # The request the scheduler charged at dispatch
+    
+    def release_payload(self):
+        """Drop the document and other bulky inputs once the job has completed.
+        
+        The worker stays referenced by its job for the results view, which only
+        needs the small bookkeeping attributes.
+        """
+        self.document_content = None
+        self.document_path = None
+        self.document_index = None
+        self._full_document = None
+        self._trimmed_document = None
+        self.image_hashes = {}
+        self._tracker = None
+    
+    def cancel(self):
+        """Ask the worker to stop at the next stage boundary and abort open streams.
+        
+        Safe to call from the GUI thread. The worker emits cancelled once it has
+        unwound; unary calls already in flight are abandoned rather than awaited.
+        """
+        self._cancel_event.set()
+        with self._streams_lock:
+            streams = list(self._open_streams)
+        for response in streams:
+            abort = getattr(getattr(response, "_iterator", None), "cancel", None)
+            if abort is not None:
+                abort()
+    
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+    
+    def _check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise GenerationCancelled()
+    
+    def _sleep(self, seconds: float):
+        """time.sleep() that wakes up early when the worker is cancelled."""
+        if self._cancel_event.wait(seconds):
+            raise GenerationCancelled()
+    
+    def _wait_first(self, futures, timeout: Optional[float] = None) -> set:
+        """wait(FIRST_COMPLETED) that keeps checking for cancellation."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._check_cancelled()
+            step = CANCEL_POLL_INTERVAL
+            if deadline is not None:
+                step = min(step, max(0.0, deadline - time.monotonic()))
+            done, _ = wait(futures, timeout=step, return_when=FIRST_COMPLETED)
+            self._tracker.tick()
+            if done or (deadline is not None and time.monotonic() >= deadline):
+                return done
+    
+    def run(self):
+        try:
+            self._tracker = ProgressTracker(self._progress_stages(), self.progress.emit, self.status_message.emit)
+            self._tracker.start("prepare")
+            
+            # Borrow the shared session for this key instead of reconfiguring genai
+            client = CLIENT_POOL.get(self.api_key, GEMINI_MODEL)
+            model = client.model
+            
+            # Large text documents are only read now that the prompt needs them
+            if self.document_content is None and self.document_path:
+                self.document_content = read_text(
+                    self.document_path, self.document_encoding,
+                    lambda done, total: self._tracker.update(done / total, f"reading {done / 1e6:.1f} / {total / 1e6:.1f} MB"),
+                    self.is_cancelled,
+                )
+            
+            self._full_document = self.document_content
+            if self.incremental:
+                self._plan_incremental()
+                if self.incremental_plan and not self.incremental_plan["changed"] and not self.dry_run:
+                    self._finish("")
+                    return
+            
+            if self.focus_sections and self.incremental_plan is None:
+                self._focus_document()
+            
+            # Collapse near-identical screenshots before they reach the prompt
+            if (self.dedupe_threshold is not None and len(self.image_paths) > 1
+                    and self.input_mode in ("image", "combined")):
+                self.image_paths = self._dedupe_images()
+            
+            self._check_cancelled()
+            
+            # Build the prompt
+            prompt = self._build_prompt()
+            chunks = self._document_chunks()
+            
+            # Serve identical requests from the local response cache
+            cache_key = None
+            if self.use_cache:
+                options = f"budget={self.token_budget}" + (":chunked" if len(chunks) > 1 else "")
+                cache_key = self._cache_key(prompt, options)
+                cached = RESPONSE_CACHE.get(cache_key)
+                if cached is not None:
+                    self.from_cache = True
+                    self._finish(cached)
+                    return
+            
+            # Prepare media content for the API call
+            content = []
+            
+            # Add all images if we're in image or combined mode
+            if self.image_paths and self.input_mode in ("image", "combined"):
+                self._tracker.start("encode", f"0/{len(self.image_paths)} images")
+                content.extend(self._preprocess_images())
+            
+            # Add video if in video mode
+            if self.video_path and self.input_mode == "video":
+                if self.video_ingest == "keyframes":
+                    self._tracker.start("keyframes")
+                    content.extend(self._keyframe_content())
+                elif not self.dry_run:
+                    content.append(self._prepare_video(client))
+            
+            self._check_cancelled()
+            
+            # Estimate the request and trim it to the token budget
+            self._tracker.start("preflight")
+            content, prompt = self._preflight(model, content, prompt, chunks)
+            if self.dry_run:
+                return
+            
+            self._tracker.start("generate", expected_seconds=self.preflight["latency"])
+            
+            # Large shared context goes into a Gemini cache reused across test types
+            cache_model = None
+            if self.context_cache and len(chunks) == 1:
+                cache_model = self._context_cache_model(client, content)
+            
+            # Generate response
+            if len(chunks) > 1:
+                result = self._generate_chunked(model, content, chunks)
+            elif cache_model is not None:
+                try:
+                    # The prompt only points at the cached document when there is one
+                    cached_document = CACHED_DOCUMENT_NOTE if self._context_document() else None
+                    result = self._generate_single(cache_model, [], cached_document)
+                except google_exceptions.NotFound:
+                    # Cache deleted or expired server-side - forget it and send inline
+                    CONTEXT_CACHE_REGISTRY.discard(self.api_key, self._context_key())
+                    self.cached_context = None
+                    result = self._generate_single(model, content, self._trimmed_document)
+            else:
+                result = self._generate_single(model, content, self._trimmed_document)
+            
+            self._check_cancelled()
+            
+            if cache_key is not None and result:
+                RESPONSE_CACHE.put(cache_key, result)
+            
+            self._finish(result)
+            
+        except GenerationCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            if self.is_cancelled():
+                # Aborted stream or upload surfaced as a transport error
+                self.cancelled.emit()
+            else:
+                self.error.emit(str(e))
+    
+    def _finish(self, result: str):
+        """Merge in reused test cases, record the suite for the next revision and emit it."""
+        index = None
+        if self._suite_key is not None:
+            index = self.document_index or SectionIndex(self._full_document)
+        if self.incremental_plan is not None:
+            self.status_message.emit("Merging • Combining new and reused test cases")
+            result = merge_incremental(self.incremental_plan, result, index,
+                                       self.app_context or "Requirements Document")
+        if self._suite_key is not None and result:
+            try:
+                SUITE_HISTORY.record(self._suite_key, self._full_document, result, index)
+            except OSError:
+                pass  # History is best effort
+        self._tracker.finish()
+        self.finished.emit(result)
+    
+    def _plan_incremental(self):
+        """Reuse the last suite for this document and send only added or changed sections."""
+        if not (self.history_path and self.document_content and self.input_mode == "document"):
+            return
+        self._suite_key = SUITE_HISTORY.suite_key(self.history_path, self.test_type, self.app_context, GEMINI_MODEL)
+        if not self.use_cache:
+            return  # Fresh run requested - regenerate everything, but record it for next time
+        previous = SUITE_HISTORY.load(self._suite_key)
+        if previous is None:
+            return
+        
+        sections = self.document_index.sections if self.document_index else split_sections(self.document_content)
+        plan = plan_incremental(previous, sections)
+        if plan is None:
+            return
+        
+        self.incremental_plan = plan
+        if plan["changed"]:
+            changed = "\n\n".join(sections[i] for i in plan["changed"])
+            self.document_content = f"{REVISED_SECTIONS_NOTE}\n\n{changed}"
+        self.status_message.emit(
+            f"Preparing • {len(plan['changed'])} of {plan['sections']} sections changed, "
+            f"reusing {len(plan['reused'])} test cases"
+        )
+    
+    def _focus_document(self):
+        """Replace a large document with the sections most relevant to the app context."""
+        query = self.app_context.strip()
+        if (not query or not self.document_content or self.input_mode not in ("document", "combined")
+                or estimate_tokens(self.document_content) <= RETRIEVAL_TOKEN_BUDGET):
+            return
+        if len(self._document_chunks()) > 1:
+            return  # Map-reduce covers the whole document; focusing would drop requirements
+        
+        if not self.fan_out:
+            query += " " + TEST_TYPE_KEYWORDS.get(self.test_type, "")
+        index = self.document_index or SectionIndex(self.document_content)
+        selection = index.select(query, RETRIEVAL_TOKEN_BUDGET)
+        if selection is None:
+            self.status_message.emit("Preparing • No sections match the app context, sending the whole document")
+            return
+        
+        self.document_content, kept = selection
+        self.focused_sections = (kept, len(index.sections))
+        self.status_message.emit(
+            f"Preparing • Sending {kept} of {len(index.sections)} sections relevant to \"{self.app_context.strip()}\""
+        )
+    
+    def _progress_stages(self) -> List[str]:
+        """The pipeline stages this request will go through, for progress weighting."""
+        stages = ["prepare"]
+        if self.image_paths and self.input_mode in ("image", "combined"):
+            stages.append("encode")
+        if self.video_path and self.input_mode == "video":
+            if self.video_ingest == "keyframes":
+                stages.append("keyframes")
+            elif not self.dry_run:
+                stages.extend(["upload", "process"])
+        stages.append("preflight")
+        if not self.dry_run:
+            stages.append("generate")
+        return stages
+    
+    def _context_document(self) -> Optional[str]:
+        """The (possibly trimmed) document, if this request sends one."""
+        document = self._trimmed_document or self.document_content
+        if document and self.input_mode in ("document", "combined"):
+            return document
+        return None
+    
+    def _context_parts(self, media: list) -> list:
+        """The shared part of the request: media plus the (possibly trimmed) document."""
+        document = self._context_document()
+        if document:
+            return media + [f"**Document Content:**\n{document}"]
+        return list(media)
+    
+    def _context_key(self) -> str:
+        document = self._trimmed_document or self.document_content or ""
+        return self._cache_key(document, "context")
+    
+    def _context_cache_model(self, client: GeminiClient, media: list) -> Optional[genai.GenerativeModel]:
+        """Return a model bound to a Gemini cache of the shared context, creating it if needed.
+        
+        Returns None when the context is too small to cache or caching fails,
+        in which case the request is sent inline as usual.
+        """
+        parts = self._context_parts(media)
+        if estimate_content_tokens(parts, self._video_seconds()) < CONTEXT_CACHE_MIN_TOKENS:
+            return None
+        
+        context_key = self._context_key()
+        name = CONTEXT_CACHE_REGISTRY.get(self.api_key, context_key)
+        if name is None:
+            self.status_message.emit("Processing • Caching document context on Gemini")
+            try:
+                cached = client.create_cached_content(parts, ttl=CONTEXT_CACHE_TTL)
+            except Exception as e:
+                self.status_message.emit(f"Processing • Context caching unavailable, sending inline ({e})")
+                return None
+            name = cached.name
+            self.created_context = True
+            expires_at = cached.expire_time.timestamp() if cached.expire_time else time.time() + CONTEXT_CACHE_TTL
+            CONTEXT_CACHE_REGISTRY.put(self.api_key, context_key, name, expires_at)
+        else:
+            self.status_message.emit("Processing • Reusing cached document context")
+        
+        self.cached_context = name
+        return client.cached_model(name)
+    
+    def _cache_key(self, prompt: str, options: str = "") -> str:
+        """Build the response cache key for this request's inputs."""
+        image_paths = self.image_paths if self.input_mode in ("image", "combined") else []
+        image_digests = [self._image_digest(p) for p in image_paths]
+        video_hash = None
+        if self.video_path and self.input_mode == "video":
+            video_hash = self._video_hash()
+        if image_paths:
+            options += f":{self.image_max_edge}:{IMAGE_FORMAT}:{IMAGE_QUALITY}"
+        if video_hash and self.video_ingest == "keyframes":
+            options += f":keyframes:{KEYFRAME_SAMPLE_FPS}:{KEYFRAME_DIFF_THRESHOLD}:{KEYFRAME_MAX_FRAMES}"
+        return ResponseCache.make_key(prompt, image_digests, video_hash, GEMINI_MODEL, options)
+    
+    def _image_digest(self, img_path: str) -> str:
+        """SHA-256 of an image file, computed once per worker."""
+        with self._digest_lock:
+            if img_path not in self._image_sha256:
+                self._image_sha256[img_path] = file_sha256(img_path)
+            return self._image_sha256[img_path]
+    
+    def _video_hash(self) -> str:
+        if self._video_sha256 is None:
+            self._video_sha256 = file_sha256(self.video_path)
+        return self._video_sha256
+    
+    def _keyframe_content(self) -> list:
+        """Extract scene-change keyframes and label each with its timestamp."""
+        keyframes = extract_keyframes(self.video_path, progress_callback=self._on_decode_progress)
+        if not keyframes:
+            raise ValueError("No frames could be decoded from the video")
+        
+        self.keyframe_count = len(keyframes)
+        self.status_message.emit(f"Processing • Sending {len(keyframes)} keyframes")
+        parts = []
+        for number, frame in enumerate(keyframes, 1):
+            parts.append(f"Keyframe {number} at {format_timestamp(frame['timestamp'])}:")
+            parts.append({"mime_type": frame["mime_type"], "data": frame["data"]})
+        return parts
+    
+    def _on_decode_progress(self, frames_read: int, total_frames: int):
+        self._check_cancelled()
+        self._tracker.update(frames_read / total_frames, f"{frames_read:,} / {total_frames:,} frames")
+    
+    def _prepare_video(self, client: GeminiClient):
+        """Return an ACTIVE Gemini file for the video, reusing a previous upload if possible."""
+        video_hash = self._video_hash()
+        name = UPLOAD_REGISTRY.get(self.api_key, video_hash)
+        if name:
+            try:
+                video_file = client.get_file(name)
+                if video_file.state.name != "FAILED":
+                    self.status_message.emit("Processing • Reusing previously uploaded video")
+                    return self._wait_for_video(client, video_file, video_hash)
+            except google_exceptions.GoogleAPIError:
+                pass  # Deleted or expired early - upload again
+            UPLOAD_REGISTRY.discard(self.api_key, video_hash)
+        
+        self._tracker.start("upload")
+        video_file = client.upload_file(self.video_path, progress_callback=self._on_upload_progress)
+        expiration = getattr(video_file, "expiration_time", None)
+        expires_at = expiration.timestamp() if expiration else time.time() + UPLOAD_DEFAULT_LIFETIME
+        UPLOAD_REGISTRY.put(self.api_key, video_hash, video_file.name, expires_at)
+        return self._wait_for_video(client, video_file, video_hash)
+    
+    def _on_upload_progress(self, sent: int, total: int):
+        self._check_cancelled()
+        fraction = sent / total if total else 1.0
+        self._tracker.update(fraction, f"{fraction:.0%} ({sent / 1e6:.1f} / {total / 1e6:.1f} MB)")
+    
+    def _wait_for_video(self, client: GeminiClient, video_file, video_hash: str):
+        """Poll with growing intervals until the file leaves PROCESSING."""
+        started = time.monotonic()
+        delay = VIDEO_POLL_INITIAL
+        self._tracker.start("process", f"file {video_file.state.name}")
+        while video_file.state.name == "PROCESSING":
+            elapsed = time.monotonic() - started
+            if elapsed + delay > VIDEO_PROCESSING_TIMEOUT:
+                raise TimeoutError(f"Video processing did not finish within {VIDEO_PROCESSING_TIMEOUT:.0f}s")
+            self._tracker.update(0.0, f"file {video_file.state.name}")
+            self._sleep(delay)
+            delay = min(delay * 1.5, VIDEO_POLL_MAX)
+            video_file = client.get_file(video_file.name)
+        
+        if video_file.state.name == "FAILED":
+            UPLOAD_REGISTRY.discard(self.api_key, video_hash)
+            raise Exception("Video processing failed")
+        
+        self._tracker.update(1.0, f"file {video_file.state.name}")
+        return video_file
+    
+    def _dedupe_images(self) -> List[str]:
+        """Drop near-duplicate images, hashing any the GUI hasn't hashed yet.
+        
+        Images that can't be hashed are never treated as duplicates.
+        """
+        missing = [p for p in self.image_paths if p not in self.image_hashes]
+        if missing:
+            pool = get_process_pool()
+            futures = {pool.submit(perceptual_hash, path): path for path in missing}
+            for future in as_completed(futures):
+                try:
+                    self.image_hashes[futures[future]] = future.result()
+                except Exception:
+                    continue  # Unreadable; _preprocess_images skips it later
+        
+        duplicates = find_near_duplicates(self.image_paths, self.image_hashes, self.dedupe_threshold)
+        self.skipped_duplicates = [p for p in self.image_paths if p in duplicates]
+        return [p for p in self.image_paths if p not in duplicates]
+    
+    def _preprocess_images(self) -> List[dict]:
+        """Downsize and re-encode all images in parallel, keeping their order.
+        
+        Images that can't be decoded are skipped and dropped from image_paths.
+        """
+        pool = get_process_pool()
+        futures = [
+            pool.submit(preprocess_image, img_path, self.image_max_edge)
+            for img_path in self.image_paths
+        ]
+        sizes = []
+        for img_path in self.image_paths:
+            try:
+                sizes.append(os.path.getsize(img_path))
+            except OSError:
+                sizes.append(0)
+        total = sum(sizes) or 1
+        
+        try:
+            blobs = []
+            unreadable = []
+            encoded = 0
+            for number, (img_path, future, size) in enumerate(zip(self.image_paths, futures, sizes), 1):
+                self._check_cancelled()
+                try:
+                    blobs.append(future.result())
+                except (OSError, ValueError, Image.DecompressionBombError):
+                    unreadable.append(img_path)  # Corrupt or truncated; the rest can still be used
+                encoded += size
+                self._tracker.update(
+                    encoded / total,
+                    f"{number}/{len(futures)} images ({encoded / 1e6:.1f} / {total / 1e6:.1f} MB)"
+                )
+            if unreadable:
+                self.skipped_unreadable.extend(unreadable)
+                skipped = set(unreadable)
+                self.image_paths = [p for p in self.image_paths if p not in skipped]
+                if not self.image_paths and self.input_mode == "image":
+                    raise ValueError("None of the selected images could be read")
+            return blobs
+        finally:
+            # No-op once finished; drops queued images after a cancel or failure
+            for future in futures:
+                future.cancel()
+    
+    def _preflight(self, model, media: list, prompt: str, chunks: List[str]):
+        """Estimate tokens and latency, trimming the request if it exceeds the budget.
+        
+        Token counts are local estimates. count_tokens is called at most once,
+        for dry runs or when the estimate is close to the budget, and scales
+        the estimates used while trimming. Trimming escalates from lowering
+        image resolution to truncating low-value document sections. Returns
+        the (possibly reduced) media list and prompt.
+        """
+        actions = []
+        
+        if len(chunks) > 1:
+            # Each part is already bounded by DOCUMENT_CHUNK_CHARS
+            input_tokens = sum(
+                estimate_content_tokens(media + [self._build_prompt(chunk)], self._video_seconds())
+                for chunk in chunks
+            )
+            method = "local estimate"
+        else:
+            scale = 1.0
+            method = "local estimate"
+            estimate = lambda: round(estimate_content_tokens(media + [prompt], self._video_seconds()) * scale)
+            input_tokens = estimate()
+            if self.dry_run or (self.token_budget
+                                and input_tokens >= self.token_budget * (1 - PREFLIGHT_COUNT_MARGIN)):
+                counted, method = self._count_tokens(model, media + [prompt])
+                scale = counted / max(input_tokens, 1)
+                input_tokens = counted
+            over = lambda: self.token_budget and input_tokens > self.token_budget
+            
+            for max_edge in IMAGE_TRIM_EDGES:
+                if not (over() and self.image_paths):
+                    break
+                if self.image_max_edge and max_edge >= self.image_max_edge:
+                    continue
+                self.image_max_edge = max_edge
+                media = self._preprocess_images()
+                input_tokens = estimate()
+                actions.append(f"images reduced to {max_edge} px")
+            
+            document = self._trimmed_document or self.document_content
+            if over() and document:
+                excess = (input_tokens - self.token_budget) / scale
+                target = max(estimate_tokens(document) - int(excess), MIN_DOCUMENT_TOKENS)
+                if target < estimate_tokens(document):
+                    self._trimmed_document = trim_document(document, target)
+                    prompt = self._build_prompt(self._trimmed_document)
+                    input_tokens = estimate()
+                    actions.append("document truncated")
+            
+            if over():
+                raise ValueError(
+                    f"Request needs ~{input_tokens:,} input tokens, over the {self.token_budget:,} "
+                    "token budget even after trimming. Remove some inputs or raise the budget."
+                )
+        
+        if self.dry_run and self.video_path and self.video_ingest == "upload":
+            input_tokens += int(VIDEO_TOKENS_PER_SECOND * (self._video_seconds() or DEFAULT_VIDEO_SECONDS))
+        
+        requests = len(chunks)
+        rounds = math.ceil(requests / CHUNK_CONCURRENCY)
+        if self.fan_out:
+            # Every test type resends the same input
+            requests = len(self.fan_out)
+            input_tokens *= requests
+            rounds = math.ceil(requests / CHUNK_CONCURRENCY)
+        output_tokens = EXPECTED_OUTPUT_TOKENS * requests
+        self.preflight = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "latency": estimate_latency(input_tokens // requests, EXPECTED_OUTPUT_TOKENS) * rounds,
+            "method": method,
+            "requests": requests,
+            "trimmed": actions,
+        }
+        self.preflight_ready.emit(self.preflight)
+        self.status_message.emit(f"Pre-flight • {format_preflight(self.preflight)}")
+        return media, prompt
+    
+    def _count_tokens(self, model, content: list):
+        """Count tokens with the API, falling back to a local estimate. Returns (tokens, method)."""
+        self.charge_request()
+        try:
+            tokens = self._call_cancellable(
+                lambda: model.count_tokens(content, request_options=request_options(COUNT_TOKENS_TIMEOUT)).total_tokens
+            )
+            return tokens, "count_tokens"
+        except GenerationCancelled:
+            raise
+        except Exception:
+            return estimate_content_tokens(content, self._video_seconds()), "local estimate"
+    
+    def _video_seconds(self) -> Optional[float]:
+        """Duration of the video, if it can be read locally."""
+        if not (self.video_path and self.input_mode == "video") or cv2 is None:
+            return None
+        capture = cv2.VideoCapture(self.video_path)
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            frames = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+            return frames / fps if fps and frames else None
+        finally:
+            capture.release()
+    
+    def _document_chunks(self) -> List[str]:
+        """Document pieces for map-reduce generation (a single item when not chunking)."""
+        if not self.chunked or not self.document_content or self.fan_out:
+            return [self.document_content]
+        return chunk_document(self.document_content, DOCUMENT_CHUNK_CHARS)
+    
+    def _generate_chunked(self, model, media: list, chunks: List[str]) -> str:
+        """Generate test cases per document chunk in parallel, then merge them into one suite.
+        
+        Each chunk's response is cached on its own, so a re-run only regenerates
+        chunks that failed or whose text changed.
+        """
+        self.chunk_count = len(chunks)
+        results: List[Optional[str]] = [None] * len(chunks)
+        errors = []
+        
+        with ThreadPoolExecutor(max_workers=CHUNK_CONCURRENCY) as executor:
+            futures = {
+                executor.submit(self._generate_chunk, model, media, chunk, index, len(chunks)): index
+                for index, chunk in enumerate(chunks)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    errors.append((index, e))
+                    continue
+                
+                self._tracker.update(done / len(chunks), f"{done}/{len(chunks)} document parts done")
+                if self.stream:
+                    self.chunk_received.emit(
+                        "", f"\n── Part {index + 1} of {len(chunks)} ──\n{results[index]}\n"
+                    )
+        
+        self._check_cancelled()
+        if errors:
+            index, error = errors[0]
+            raise Exception(
+                f"{len(errors)} of {len(chunks)} document parts failed (part {index + 1}: {error}). "
+                "Completed parts are cached - generate again to retry only the failed parts."
+            )
+        
+        self.status_message.emit("Merging • De-duplicating and renumbering test cases")
+        return merge_test_suites(results, self.app_context or "Requirements Document")
+    
+    def _generate_single(self, model, media: list, document_content: Optional[str]) -> str:
+        """Send the request, or one request per test type when fanning out."""
+        if self.fan_out:
+            return self._generate_fan_out(model, media, document_content)
+        return self._generate_with_retry(model, media + [self._build_prompt(document_content)])
+    
+    def _generate_fan_out(self, model, media: list, document_content: Optional[str]) -> str:
+        """Generate every test type in parallel from the same encoded media, then merge.
+        
+        Each test type is cached under the same key as a single-type run, so a
+        re-run only regenerates the types that failed.
+        """
+        results = {}
+        errors = []
+        if self.stream:
+            for test_type in self.fan_out:
+                self.chunk_received.emit(test_type, "")  # Lay out the sections in order
+        
+        with ThreadPoolExecutor(max_workers=min(len(self.fan_out), CHUNK_CONCURRENCY)) as executor:
+            futures = {
+                executor.submit(self._generate_test_type, model, media, document_content, test_type): test_type
+                for test_type in self.fan_out
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                test_type = futures[future]
+                try:
+                    results[test_type] = future.result()
+                except Exception as e:
+                    errors.append((test_type, e))
+                    continue
+                
+                self._tracker.update(done / len(self.fan_out), f"{done}/{len(self.fan_out)} test types done")
+        
+        self._check_cancelled()
+        if errors:
+            test_type, error = errors[0]
+            raise Exception(
+                f"{len(errors)} of {len(self.fan_out)} test types failed ({test_type}: {error}). "
+                "Completed test types are cached - generate again to retry only the failed ones."
+            )
+        
+        self.status_message.emit("Merging • De-duplicating and renumbering test cases")
+        title = f"{self.app_context or 'Android App'} - All Test Types"
+        return merge_test_suites([results[test_type] for test_type in self.fan_out], title)
+    
+    def _generate_test_type(self, model, media: list, document_content: Optional[str], test_type: str) -> str:
+        """Generate (or load from cache) the test cases for one test type of a fan-out."""
+        cache_key = None
+        if self.use_cache:
+            # Keyed on the full-document prompt, matching a single-type run
+            cache_key = self._cache_key(self._build_prompt(test_type=test_type), f"budget={self.token_budget}")
+            cached = RESPONSE_CACHE.get(cache_key)
+            if cached is not None:
+                if self.stream:
+                    self.chunk_received.emit(test_type, cached)
+                return cached
+        
+        prompt = self._build_prompt(document_content, test_type)
+        if not self._prepaid_request.acquire(blocking=False):
+            self.acquire_request()
+        result = self._generate_with_retry(model, media + [prompt], section=test_type)
+        if cache_key is not None and result:
+            RESPONSE_CACHE.put(cache_key, result)
+        return result
+    
+    def _generate_chunk(self, model, media: list, chunk: str, index: int, total: int) -> str:
+        """Generate (or load from cache) the test cases for one document chunk."""
+        chunk_document_content = (
+            f"[Part {index + 1} of {total} of a larger document. Only write test cases for "
+            f"requirements covered in this part.]\n\n{chunk}"
+        )
+        prompt = self._build_prompt(chunk_document_content)
+        # Keyed on the chunk's own text, not its "Part i of n" label, so edits that
+        # add chunks or shift boundaries elsewhere keep the unchanged chunks cached
+        cache_key = self._cache_key(self._build_prompt(chunk.strip()), "chunk") if self.use_cache else None
+        if cache_key is not None:
+            cached = RESPONSE_CACHE.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        result = self._generate_with_retry(model, media + [prompt], stream=False)
+        if cache_key is not None and result:
+            RESPONSE_CACHE.put(cache_key, result)
+        return result
+    
+    def _generate_with_retry(self, model, content, stream: Optional[bool] = None, section: str = "") -> str:
+        """Call the model, retrying transient failures within the policy's deadlines.
+        
+        Streamed text is emitted under section, one per test type of a fan-out.
+        """
+        stream = self.stream if stream is None else stream
+        policy = self.retry_policy
+        started = time.monotonic()
+        
+        for attempt in range(1, policy.max_attempts + 1):
+            self._check_cancelled()
+            if attempt > 1:
+                self.charge_request()
+            remaining = policy.overall_deadline - (time.monotonic() - started)
+            timeout = max(1.0, min(policy.attempt_timeout, remaining))
+            attempt_started = time.monotonic()
+            try:
+                if stream:
+                    result = self._generate_streamed(model, content, timeout, section)
+                elif self.hedge:
+                    result = self._generate_hedged(model, content, timeout)
+                else:
+                    result = self._generate_unary(model, content, timeout)
+            except GenerationCancelled:
+                raise
+            except Exception as e:
+                self._check_cancelled()
+                latency = time.monotonic() - attempt_started
+                self.attempts.append({"attempt": attempt, "latency": latency, "error": str(e)})
+                if not is_retryable(e) or attempt == policy.max_attempts:
+                    raise
+                
+                delay = policy.backoff(attempt)
+                if time.monotonic() - started + delay >= policy.overall_deadline:
+                    raise
+                
+                if section in self._partial_output:
+                    # The retry streams from scratch, so drop what was shown
+                    self._partial_output.discard(section)
+                    self.stream_restarted.emit(section)
+                self.status_message.emit(
+                    f"Retrying • attempt {attempt + 1}/{policy.max_attempts} in {delay:.1f}s "
+                    f"after {type(e).__name__}"
+                )
+                self._sleep(delay)
+                continue
+            
+            latency = time.monotonic() - attempt_started
+            LATENCY_TRACKER.record(latency)
+            self.attempts.append({"attempt": attempt, "latency": latency, "error": None})
+            return result
+    
+    def _generate_unary(self, model, content, timeout: float) -> str:
+        """Send one request without blocking cancel()."""
+        return self._call_cancellable(
+            lambda: model.generate_content(content, request_options=request_options(timeout)).text
+        )
+    
+    def _call_cancellable(self, call):
+        """Run a blocking API call on a helper thread so cancel() doesn't have to wait for it."""
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            future = executor.submit(call)
+            self._wait_first([future])
+            return future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _generate_hedged(self, model, content, timeout: float) -> str:
+        """Send a backup request if the first one runs past the p95 latency."""
+        hedge_after = LATENCY_TRACKER.percentile(95)
+        
+        def call():
+            return model.generate_content(content, request_options=request_options(timeout)).text
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            futures = [executor.submit(call)]
+            done = self._wait_first(futures, timeout=hedge_after)
+            if not done:
+                self.status_message.emit(
+                    f"Hedging • no response after {hedge_after:.1f}s (p95), sending a backup request"
+                )
+                self.charge_request()
+                futures.append(executor.submit(call))
+            
+            # First successful response wins; only fail if every request failed
+            last_error = None
+            pending = set(futures)
+            while pending:
+                for future in self._wait_first(pending):
+                    pending.discard(future)
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        last_error = e
+            raise last_error
+        finally:
+            # Don't block on the losing request
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _generate_streamed(self, model, content, timeout: float, section: str = "") -> str:
+        """Generate with stream=True, emitting each text chunk under section as it arrives.
+        
+        The stream is read on a helper thread (the SDK blocks until the first
+        chunk), so this thread can keep ticking the progress tracker and notice
+        cancellation while no data is arriving.
+        """
+        chunks = queue.Queue()  # (chunk, None), (None, error) or (None, None) at the end
+        
+        def read():
+            response = None
+            try:
+                response = model.generate_content(content, stream=True, request_options=request_options(timeout))
+                with self._streams_lock:
+                    self._open_streams.add(response)
+                if self.is_cancelled():
+                    return  # cancel() ran before the stream was registered
+                for chunk in response:
+                    chunks.put((chunk, None))
+                chunks.put((None, None))
+            except Exception as e:
+                chunks.put((None, e))
+            finally:
+                with self._streams_lock:
+                    self._open_streams.discard(response)
+        
+        threading.Thread(target=read, name="gemini-stream", daemon=True).start()
+        parts = []
+        received_tokens = 0
+        while True:
+            try:
+                chunk, error = chunks.get(timeout=CANCEL_POLL_INTERVAL)
+            except queue.Empty:
+                self._check_cancelled()
+                self._tracker.tick()  # Elapsed time, ETA and the "no data" warning
+                continue
+            self._check_cancelled()
+            if error is not None:
+                raise error
+            if chunk is None:
+                return ''.join(parts)
+            
+            # The final chunk may only carry the finish reason and no text
+            text = chunk.text if chunk.parts else ""
+            if text:
+                parts.append(text)
+                self._partial_output.add(section)
+                self.chunk_received.emit(section, text)
+                if section:
+                    continue  # A fan-out reports progress per finished test type
+                received_tokens += estimate_tokens(text)
+                self._tracker.update(
+                    min(0.99, received_tokens / EXPECTED_OUTPUT_TOKENS),
+                    f"{received_tokens:,} / ~{EXPECTED_OUTPUT_TOKENS:,} tokens"
+                )
+    
+    def _build_prompt(self, document_content: Optional[str] = None, test_type: Optional[str] = None) -> str:
+        """Build the prompt for test case generation.
+        
+        document_content overrides self.document_content, e.g. for one chunk;
+        test_type overrides self.test_type for one request of a fan-out.
+        """
+        if document_content is None:
+            document_content = self.document_content
+        test_type = test_type or self.test_type
+        
+        num_images = len(self.image_paths) if self.image_paths else 0
+        
+        base_prompt = f"""You are an expert Android QA Engineer and Test Automation Specialist. 
+Your task is to generate comprehensive test cases for an Android mobile application.
+
+**Test Type Requested:** {test_type}
+
+**Application Context:** {self.app_context if self.app_context else "General Android application"}
+
+"""
+        
+        if self.input_mode == "combined" and self.image_paths and document_content:
+            base_prompt += f"""**Input Mode:** COMBINED (Images + Document)
+
+You have been provided with:
+1. {num_images} screenshot(s)/image(s) of the Android app screens
+2. A document with additional specifications/requirements
+
+Analyze ALL images and the document content together to generate comprehensive test cases. The images show the visual UI and user flow while the document provides context, requirements, and specifications.
+
+**Document Content:**
+""" + document_content + """
+
+"""
+        elif self.input_mode == "image" and self.image_paths:
+            base_prompt += f"""**Input Mode:** IMAGE ONLY ({num_images} image(s) provided)
+
+Analyze the provided {num_images} screenshot(s)/image(s) to identify:
+1. UI elements (buttons, text fields, lists, dropdowns, etc.)
+2. Navigation patterns and screen flow indicators
+3. User interaction points and touch targets
+4. Visual states and feedback indicators
+5. Relationships between different screens (if multiple images)
+6. Potential edge cases based on visible UI elements
+
+"""
+        elif self.input_mode == "document" and document_content:
+            base_prompt += """**Input Mode:** DOCUMENT ONLY
+
+Analyze the provided document containing specifications/requirements:
+
+**Document Content:**
+""" + document_content + """
+
+"""
+        elif self.input_mode == "video" and self.video_path and self.video_ingest == "keyframes":
+            base_prompt += """**Input Mode:** VIDEO ANALYSIS - KEYFRAMES (Premium Feature)
+
+You have been provided with keyframes extracted from a screen recording of the Android app.
+Each keyframe was captured where the screen changed and is preceded by its timestamp (MM:SS.s).
+Static stretches between keyframes were removed, so treat consecutive keyframes as the
+before/after states of a user action.
+
+Analyze the keyframe sequence to identify:
+1. User interactions implied by each screen change (taps, swipes, scrolls, text entry)
+2. Screen transitions and navigation flow
+3. UI elements visible on each screen
+4. Loading states, dialogs and error states
+5. Timing between actions and responses (from the timestamps)
+6. Complete user journey/workflow captured in the recording
+
+Focus on creating test cases that:
+- Verify the exact flow shown in the keyframes
+- Test timing and responsiveness
+- Cover the user interactions demonstrated
+- Include edge cases based on the observed behavior
+
+"""
+        elif self.input_mode == "video" and self.video_path:
+            base_prompt += """**Input Mode:** VIDEO ANALYSIS (Premium Feature)
+
+Analyze the provided video recording of the Android app to identify:
+1. User interactions and gestures (taps, swipes, scrolls, long presses)
+2. Screen transitions and navigation flow
+3. UI elements that appear during the recording
+4. Loading states and animations
+5. Error states or unexpected behaviors
+6. Timing between actions and responses
+7. Complete user journey/workflow captured in the video
+
+Focus on creating test cases that:
+- Verify the exact flow shown in the video
+- Test timing and responsiveness
+- Cover the user interactions demonstrated
+- Include edge cases based on the observed behavior
+
+"""
+        
+        base_prompt += """
+**Generate Test Cases in this CLEAN, EASY-TO-READ format:**
+
+══════════════════════════════════════════════════════════════════════════════
+                         TEST SUITE: [Feature Name]
+══════════════════════════════════════════════════════════════════════════════
+
+For EACH test case, use this EXACT format:
+
+──────────────────────────────────────────────────────────────────────────────
+TEST CASE ID:     TC-001
+TEST CASE NAME:   [Clear descriptive title]
+──────────────────────────────────────────────────────────────────────────────
+
+    PRIORITY:       [High / Medium / Low]
+    TYPE:           [Functional / UI / Security / Performance]
+    
+    ▸ PRECONDITIONS:
+      - Condition 1
+      - Condition 2
+    
+    ▸ TEST STEPS:
+      Step 1:  [First action to perform]
+      Step 2:  [Second action to perform]
+      Step 3:  [Third action to perform]
+    
+    ▸ EXPECTED RESULTS:
+      ✓ Result 1
+      ✓ Result 2
+      ✓ Result 3
+    
+    ▸ TEST DATA:
+      [Any input data, test values, or N/A]
+    
+    ▸ AUTOMATION NOTES:
+      [Espresso/Appium hints, element IDs, locators]
+
+══════════════════════════════════════════════════════════════════════════════
+
+
+FORMATTING RULES:
+1. Use ══════ for major section dividers
+2. Use ────── for test case separators
+3. Use ▸ for section headers within test case
+4. Use ✓ for expected results
+5. Use - for list items
+6. Use Step 1:, Step 2: etc for numbered steps
+7. Keep each section clearly labeled and indented
+8. Add blank lines between sections for readability
+
+Generate 10-15 comprehensive test cases covering:
+- Positive scenarios (happy path)
+- Negative scenarios (error handling, invalid inputs)
+- Boundary conditions (min/max values, empty states)
+- UI/UX validation (layout, responsiveness)
+- Edge cases (network issues, interruptions)
+- Security considerations (input validation)
+
+Include Android-specific considerations:
+- Back button behavior
+- App lifecycle (background/foreground)
+- Different screen sizes
+- Accessibility (TalkBack, font scaling)
+"""
+        
+        return base_prompt
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# JOB SCHEDULER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+SCHEDULER_MAX_WORKERS = 3
+RATE_LIMIT_RPM = 15  # Requests per minute
+RATE_LIMIT_TPM = 1_000_000  # Input + output tokens per minute
+MAX_COMPLETED_JOBS = 50  # Finished jobs kept in the queue view
+
+
+class TokenBucket:
+    """Token-bucket rate limiter refilled continuously at a per-minute rate."""
+    
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()  # Workers charge retries and hedges from their threads
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def delay_for(self, amount: float) -> float:
+        """Seconds until amount tokens are available (0 if available now)."""
+        with self._lock:
+            self._refill()
+            amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket
+            if self.tokens >= amount:
+                return 0.0
+            return (amount - self.tokens) / self.rate
+    
+    def consume(self, amount: float):
+        """Take amount tokens from the bucket."""
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+
+class GenerationJob:
+    """A generation request submitted to the JobScheduler."""
+    
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_BATCH = 1
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, worker: GeminiWorker, label: str, priority: int):
+        self.id = next(self._ids)
+        self.worker = worker
+        self.label = label
+        self.priority = priority
+        self.status = "queued"  # "queued", "running", "cancelling", "cancelled", "done", "failed"
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.estimated_requests = self._estimate_requests()
+        self.estimated_tokens = self._estimate_tokens()
+        # A fan-out draws its test types from the rate limits one request at a time
+        self.dispatch_requests = 1 if worker.fan_out else self.estimated_requests
+    
+    def _document_chars(self) -> int:
+        if self.worker.document_content is not None:
+            return len(self.worker.document_content)
+        if self.worker.document_path:
+            return os.path.getsize(self.worker.document_path)  # Not read yet
+        return 0
+    
+    def _estimate_requests(self) -> int:
+        """Generation requests the job will send (retries and hedges are charged as they happen)."""
+        worker = self.worker
+        if worker.fan_out:
+            return len(worker.fan_out)
+        if worker.chunked and worker.document_content:
+            return len(chunk_document(worker.document_content, DOCUMENT_CHUNK_CHARS))
+        if worker.chunked and worker.document_path:
+            return max(1, math.ceil(self._document_chars() / DOCUMENT_CHUNK_CHARS))
+        return 1
+    
+    def _estimate_tokens(self) -> int:
+        """Estimate input plus output tokens for rate limiting."""
+        num_images = len(self.worker.image_paths) if self.worker.input_mode in ("image", "combined") else 0
+        overhead = (estimate_tokens(self.worker._build_prompt(""))
+                    + num_images * IMAGE_TOKEN_ESTIMATE + EXPECTED_OUTPUT_TOKENS)
+        document = self._document_chars() // 4
+        if self.worker.fan_out:
+            # Every test type resends the whole document
+            return (overhead + document) * self.estimated_requests
+        # Chunks split the document between them
+        return overhead * self.estimated_requests + document
+    
+    @property
+    def completed(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+    
+    def describe(self) -> str:
+        """One-line summary for the queue view."""
+        icons = {"queued": "⏳", "running": "🔄", "cancelling": "⏹", "cancelled": "⊘", "done": "✓", "failed": "❌"}
+        kind = "" if self.priority == self.PRIORITY_INTERACTIVE else " [batch]"
+        return f"{icons[self.status]} #{self.id} {self.label}{kind} • {self.status}"
 
-Include Android-specific considerations:
-- Back button behavior
-- App lifecycle (background/foreground)
-- Different screen sizes
-- Accessibility (TalkBack, font scaling)
-"""
-        
-        return base_prompt
+
+class JobScheduler(QObject):
+    """Runs GenerationJobs on a bounded worker pool under RPM/TPM limits.
+    
+    Jobs are dispatched by priority class, then submission order, so
+    interactive jobs overtake queued batch jobs. Jobs for another API key
+    wait until the running ones finish, since the SDK is configured per process.
+    """
+    
+    queueChanged = pyqtSignal()
+    jobProgress = pyqtSignal(object, int)
+    jobChunk = pyqtSignal(object, str, str)  # job, section, text
+    jobStreamRestarted = pyqtSignal(object, str)  # job, section
+    jobStatus = pyqtSignal(object, str)
+    jobPreflight = pyqtSignal(object, object)
+    jobFinished = pyqtSignal(object)
+    jobFailed = pyqtSignal(object)
+    jobCancelled = pyqtSignal(object)
+    
+    def __init__(self, max_workers: int = SCHEDULER_MAX_WORKERS,
+                 requests_per_minute: float = RATE_LIMIT_RPM,
+                 tokens_per_minute: float = RATE_LIMIT_TPM, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.jobs: List[GenerationJob] = []
+        self._queue = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._running_key: Optional[str] = None  # The SDK holds one API key at a time
+        self._charge_lock = threading.Lock()  # Worker threads draw requests alongside dispatch
+        
+        # Fires when the rate limiter asks us to wait before the next dispatch
+        self._dispatch_timer = QTimer(self)
+        self._dispatch_timer.setSingleShot(True)
+        self._dispatch_timer.timeout.connect(self._dispatch)
+    
+    def submit(self, worker: GeminiWorker, label: str,
+               priority: int = GenerationJob.PRIORITY_INTERACTIVE) -> GenerationJob:
+        """Queue a worker for execution and return its job."""
+        job = GenerationJob(worker, label, priority)
+        worker.job = job
+        worker.charge_request = lambda: self.charge(job)
+        worker.acquire_request = lambda: self.acquire(job)
+        worker.finished.connect(self._on_worker_finished)
+        worker.error.connect(self._on_worker_error)
+        worker.progress.connect(self._on_worker_progress)
+        worker.chunk_received.connect(self._on_worker_chunk)
+        worker.stream_restarted.connect(self._on_worker_stream_restarted)
+        worker.status_message.connect(self._on_worker_status)
+        worker.preflight_ready.connect(self._on_worker_preflight)
+        worker.cancelled.connect(self._on_worker_cancelled)
+        
+        self.jobs.append(job)
+        heapq.heappush(self._queue, (priority, next(self._seq), job))
+        self.queueChanged.emit()
+        self._dispatch()
+        return job
+    
+    def pending_count(self) -> int:
+        return len(self._queue)
+    
+    def charge(self, job: GenerationJob):
+        """Charge the rate limits for a request beyond the job's estimate.
+        
+        Called from worker threads for retries, hedges and count_tokens calls.
+        """
+        with self._charge_lock:
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(job.estimated_tokens / job.estimated_requests)
+    
+    def acquire(self, job: GenerationJob):
+        """Wait until the rate limits allow one more of the job's planned requests, then charge it.
+        
+        Called from worker threads; the wait ends early if the job is cancelled.
+        """
+        tokens = job.estimated_tokens / job.estimated_requests
+        while True:
+            with self._charge_lock:
+                wait = max(self.request_bucket.delay_for(1), self.token_bucket.delay_for(tokens))
+                if wait <= 0:
+                    self.request_bucket.consume(1)
+                    self.token_bucket.consume(tokens)
+                    return
+            job.worker._sleep(wait)
+    
+    def cancel(self, job: GenerationJob):
+        """Drop a queued job, or ask a running one to stop and free its slot."""
+        if job.status == "queued":
+            self._queue = [entry for entry in self._queue if entry[2] is not job]
+            heapq.heapify(self._queue)
+            job.status = "cancelled"
+            self.jobCancelled.emit(job)
+            self._retire(job)
+            self.queueChanged.emit()
+        elif job.status == "running":
+            job.status = "cancelling"
+            job.worker.cancel()
+            self.queueChanged.emit()
+    
+    def _dispatch(self):
+        """Start queued jobs while there are free slots and rate budget."""
+        while self._queue and self._running < self.max_workers:
+            job = self._queue[0][2]
+            if self._running and job.worker.api_key != self._running_key:
+                return  # Resumes from _release once the other key's jobs are done
+            tokens = job.estimated_tokens * job.dispatch_requests / job.estimated_requests
+            with self._charge_lock:
+                wait = max(self.request_bucket.delay_for(job.dispatch_requests),
+                           self.token_bucket.delay_for(tokens))
+                if wait <= 0:
+                    self.request_bucket.consume(job.dispatch_requests)
+                    self.token_bucket.consume(tokens)
+            if wait > 0:
+                if not self._dispatch_timer.isActive():
+                    self._dispatch_timer.start(int(wait * 1000) + 1)
+                return
+            
+            heapq.heappop(self._queue)
+            self._running += 1
+            self._running_key = job.worker.api_key
+            job.status = "running"
+            job.worker.start()
+            self.queueChanged.emit()
+    
+    def _release(self, job: GenerationJob):
+        self._running -= 1
+        self._retire(job)
+        self.queueChanged.emit()
+        self._dispatch()
+    
+    def _retire(self, job: GenerationJob):
+        """Free a completed job's inputs and forget the oldest completed jobs over the cap."""
+        job.worker.release_payload()
+        completed = [j for j in self.jobs if j.completed]
+        if len(completed) > MAX_COMPLETED_JOBS:
+            dropped = set(map(id, completed[:len(completed) - MAX_COMPLETED_JOBS]))
+            self.jobs = [j for j in self.jobs if id(j) not in dropped]
+    
+    def _on_worker_finished(self, result: str):
+        job = self.sender().job
+        job.status = "done"
+        job.result = result
+        self.jobFinished.emit(job)
+        self._release(job)
+    
+    def _on_worker_error(self, error: str):
+        job = self.sender().job
+        job.status = "failed"
+        job.error = error
+        self.jobFailed.emit(job)
+        self._release(job)
+    
+    def _on_worker_progress(self, value: int):
+        self.jobProgress.emit(self.sender().job, value)
+    
+    def _on_worker_chunk(self, section: str, text: str):
+        self.jobChunk.emit(self.sender().job, section, text)
+    
+    def _on_worker_stream_restarted(self, section: str):
+        self.jobStreamRestarted.emit(self.sender().job, section)
+    
+    def _on_worker_status(self, message: str):
+        self.jobStatus.emit(self.sender().job, message)
+    
+    def _on_worker_preflight(self, preflight: dict):
+        self.jobPreflight.emit(self.sender().job, preflight)
+    
+    def _on_worker_cancelled(self):
+        job = self.sender().job
+        job.status = "cancelled"
+        self.jobCancelled.emit(job)
+        self._release(job)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -734,6 +3779,7 @@ class DropZone(QFrame):
     """Custom drop zone for files."""
     
     fileDropped = pyqtSignal(str)
+    filesDropped = pyqtSignal(list)  # Every path of one drop or selection, image zones only
     
     def __init__(self, file_type: str, parent=None):
         super().__init__(parent)
@@ -758,9 +3804,8 @@ class DropZone(QFrame):
         text_layout.setSpacing(2)
         
         # Main text
-        self.main_label = QLabel(
-            f"Drop {'Image(s)' if self.file_type == 'image' else 'Document'} Here"
-        )
+        main_text, sub_text = self._prompt_text()
+        self.main_label = QLabel(main_text)
         self.main_label.setStyleSheet("""
             font-size: 12px;
             font-weight: 600;
@@ -768,8 +3813,7 @@ class DropZone(QFrame):
         """)
         
         # Sub text
-        formats = "PNG, JPG, JPEG, GIF" if self.file_type == "image" else "PDF, DOCX, TXT"
-        self.sub_label = QLabel(f"Click to browse • {formats}")
+        self.sub_label = QLabel(sub_text)
         self.sub_label.setStyleSheet("""
             font-size: 9px;
             color: #7a7a8c;
@@ -808,6 +3852,9 @@ class DropZone(QFrame):
     def dropEvent(self, event: QDropEvent):
         self.setStyleSheet("")
         files = [url.toLocalFile() for url in event.mimeData().urls()]
+        if self.file_type == "image":
+            self.filesDropped.emit(files)  # Files and folders, added as one batch
+            return
         for f in files:
             self.fileDropped.emit(f)
     
@@ -817,15 +3864,15 @@ class DropZone(QFrame):
             files, _ = QFileDialog.getOpenFileNames(
                 self, "Select Images", "", file_filter
             )
-            for f in files:
-                self.fileDropped.emit(f)
+            if files:
+                self.filesDropped.emit(files)
         else:
             file_filter = "Documents (*.pdf *.docx *.txt *.md)"
-        file_path, _ = QFileDialog.getOpenFileName(
+            file_path, _ = QFileDialog.getOpenFileName(
                 self, "Select Document", "", file_filter
-        )
-        if file_path:
-            self.fileDropped.emit(file_path)
+            )
+            if file_path:
+                self.fileDropped.emit(file_path)
     
     def set_file(self, path: str):
         """Update UI to show selected file."""
@@ -835,73 +3882,330 @@ class DropZone(QFrame):
         self.main_label.setText("File Selected")
         self.sub_label.setText("Click to change")
     
+    def set_loading(self, path: str, detail: str = ""):
+        """Show that a file is being read."""
+        filename = Path(path).name
+        self.file_label.setText(f"⏳ {filename}" + (f" • {detail}" if detail else ""))
+        self.file_label.show()
+        self.main_label.setText("Reading File...")
+        self.sub_label.setText("Drop another file to cancel")
+    
+    def _prompt_text(self) -> tuple:
+        """Main and sub label text shown while nothing is selected."""
+        if self.file_type == "image":
+            return "Drop Image(s) Here", "Click to browse • PNG, JPG, GIF, BMP or a folder"
+        return "Drop Document Here", "Click to browse • PDF, DOCX, TXT"
+    
     def reset(self):
         """Reset to initial state."""
-        formats = "PNG, JPG, JPEG, GIF" if self.file_type == "image" else "PDF, DOCX, TXT"
-        self.main_label.setText(f"Drop {'Image' if self.file_type == 'image' else 'Document'} Here")
-        self.sub_label.setText(f"or click to browse • Supports {formats}")
+        main_text, sub_text = self._prompt_text()
+        self.main_label.setText(main_text)
+        self.sub_label.setText(sub_text)
         self.file_label.hide()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
-# IMAGE THUMBNAIL WIDGET
+# THUMBNAIL LOADING
 # ═══════════════════════════════════════════════════════════════════════════════
 
-class ImageThumbnail(QFrame):
-    """Widget to display an image thumbnail with remove button."""
+THUMBNAIL_SIZE = QSize(66, 56)
+THUMBNAIL_MEMORY_ITEMS = 2000  # Decoded thumbnails kept in memory (~15 KB each)
+THUMBNAIL_WORKERS = 4
+THUMBNAIL_EVICT_INTERVAL = 200  # Disk cache size is checked every N new thumbnails
+
+
+def decode_thumbnail(path: str, size: QSize = THUMBNAIL_SIZE) -> QImage:
+    """Decode an image directly at thumbnail size (a null QImage if unreadable).
     
-    removeClicked = pyqtSignal(str)  # Emits the image path when remove is clicked
+    QImageReader.setScaledSize lets JPEG decode at reduced resolution, and
+    other formats are scaled inside the reader, so no full-size QPixmap is built.
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)  # Apply EXIF orientation
+    source = reader.size()
+    if source.isValid():
+        reader.setScaledSize(source.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if not image.isNull() and (image.width() > size.width() or image.height() > size.height()):
+        # Rotated by EXIF after scaling - fit the (now tiny) image again
+        image = image.scaled(size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    return image
+
+
+class ThumbnailCache:
+    """On-disk PNG thumbnails keyed by image path, size and mtime, with LRU eviction."""
+    
+    def __init__(self, cache_dir: Path, max_bytes: int = 100 * 1024 * 1024):
+        self._files = CacheDirectory(cache_dir, ".png", max_bytes)
+        self._lock = threading.Lock()
+        self._stores = 0
+    
+    @staticmethod
+    def thumbnail_key(path: str, size: QSize = THUMBNAIL_SIZE) -> str:
+        stat = os.stat(path)
+        identity = f"{Path(path).resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{size.width()}x{size.height()}"
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+    
+    def load(self, key: str) -> Optional[QImage]:
+        """Return the cached thumbnail, or None on a miss."""
+        path = self._files.entry_path(key)
+        image = QImage(str(path))
+        if image.isNull():
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return image
+    
+    def store(self, key: str, image: QImage):
+        """Save a thumbnail, evicting old ones every THUMBNAIL_EVICT_INTERVAL stores."""
+        path = self._files.entry_path(key)
+        self._files.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        if not image.save(str(tmp_path), "PNG"):
+            raise OSError(f"Could not write {tmp_path}")
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._stores += 1
+            if self._stores % THUMBNAIL_EVICT_INTERVAL == 0:
+                self._files.evict()
+
+
+THUMBNAIL_CACHE = ThumbnailCache(APP_DATA_DIR / "thumbnails")
+
+
+class ThumbnailLoader(QObject):
+    """Decodes thumbnails on a thread pool and shares them between all previews.
+    
+    get() answers from memory or queues a decode; thumbnailReady(path) fires
+    on the GUI thread once the thumbnail is available.
+    """
+    
+    thumbnailReady = pyqtSignal(str)
+    _decoded = pyqtSignal(str, QImage)  # Emitted from pool threads
+    
+    def __init__(self, disk_cache: ThumbnailCache, size: QSize = THUMBNAIL_SIZE,
+                 max_items: int = THUMBNAIL_MEMORY_ITEMS):
+        super().__init__()
+        self.disk_cache = disk_cache
+        self.size = size
+        self.max_items = max_items
+        self._memory: "OrderedDict[str, QPixmap]" = OrderedDict()
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+        self._decoded.connect(self._on_decoded)
+    
+    def get(self, path: str) -> Optional[QPixmap]:
+        """Return the thumbnail if decoded (a null pixmap if unreadable), else queue it and return None."""
+        pixmap = self._memory.get(path)
+        if pixmap is not None:
+            self._memory.move_to_end(path)
+            return pixmap
+        if path not in self._pending:
+            self._pending.add(path)
+            self._executor.submit(self._load, path)
+        return None
+    
+    def _load(self, path: str):
+        """Read a thumbnail from the disk cache or decode it. Runs on a pool thread."""
+        image = QImage()
+        try:
+            key = self.disk_cache.thumbnail_key(path, self.size)
+            cached = self.disk_cache.load(key)
+            if cached is not None:
+                image = cached
+            else:
+                image = decode_thumbnail(path, self.size)
+                if not image.isNull():
+                    try:
+                        self.disk_cache.store(key, image)
+                    except OSError:
+                        pass  # Disk cache is best effort
+        except OSError:
+            pass
+        finally:
+            self._decoded.emit(path, image)
+    
+    def _on_decoded(self, path: str, image: QImage):
+        self._pending.discard(path)
+        self._memory[path] = QPixmap.fromImage(image) if not image.isNull() else QPixmap()
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+        self.thumbnailReady.emit(path)
+
+
+_thumbnail_loader: Optional[ThumbnailLoader] = None
+
+
+def thumbnail_loader() -> ThumbnailLoader:
+    """Shared thumbnail loader, created on first use from the GUI thread."""
+    global _thumbnail_loader
+    if _thumbnail_loader is None:
+        _thumbnail_loader = ThumbnailLoader(THUMBNAIL_CACHE)
+    return _thumbnail_loader
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# IMAGE THUMBNAIL MODEL & DELEGATE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ImageListModel(QAbstractListModel):
+    """List of image paths for the thumbnail strip.
+    
+    Thumbnails are requested from the shared loader only when the view asks
+    for an item's decoration, i.e. when it is about to be painted.
+    """
     
-    def __init__(self, image_path: str, parent=None):
+    PathRole = Qt.ItemDataRole.UserRole + 1
+    DuplicateOfRole = Qt.ItemDataRole.UserRole + 2
+    
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.image_path = image_path
-        self.setObjectName("imageThumbnail")
-        self.setFixedSize(75, 90)
-        self.setup_ui()
+        self._paths: List[str] = []
+        self._rows = {}  # path -> row
+        self._duplicates = {}  # duplicate path -> original path
+        thumbnail_loader().thumbnailReady.connect(self._on_thumbnail_ready)
     
-    def setup_ui(self):
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(2, 2, 2, 2)
-        layout.setSpacing(2)
-        
-        # Container for image and remove button
-        img_container = QWidget()
-        img_container.setFixedSize(70, 60)
-        
-        # Image label
-        self.image_label = QLabel(img_container)
-        self.image_label.setFixedSize(70, 60)
-        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.image_label.setStyleSheet("""
-            background: #0a0a0f;
-            border-radius: 4px;
-        """)
-        
-        # Load and scale image
-        pixmap = QPixmap(self.image_path)
-        scaled = pixmap.scaled(
-            66, 56,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        self.image_label.setPixmap(scaled)
-        
-        # Remove button (positioned at top-right)
-        self.remove_btn = QPushButton("×", img_container)
-        self.remove_btn.setObjectName("removeImageBtn")
-        self.remove_btn.setFixedSize(18, 18)
-        self.remove_btn.move(50, 2)
-        self.remove_btn.clicked.connect(lambda: self.removeClicked.emit(self.image_path))
-        self.remove_btn.setCursor(Qt.CursorShape.PointingHandCursor)
-        
-        # Filename label
-        filename = Path(self.image_path).name
-        name_label = QLabel(filename[:10] + ".." if len(filename) > 10 else filename)
-        name_label.setStyleSheet("font-size: 8px; color: #7a7a8c;")
-        name_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        
-        layout.addWidget(img_container)
-        layout.addWidget(name_label)
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._paths)
+    
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        path = self._paths[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return Path(path).name
+        if role == Qt.ItemDataRole.DecorationRole:
+            return thumbnail_loader().get(path)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            original = self._duplicates.get(path)
+            if original:
+                return f"{Path(path).name}\nNear-duplicate of {Path(original).name} - not sent to Gemini"
+            return Path(path).name
+        if role == self.PathRole:
+            return path
+        if role == self.DuplicateOfRole:
+            return self._duplicates.get(path)
+        return None
+    
+    def paths(self) -> List[str]:
+        return list(self._paths)
+    
+    def contains(self, path: str) -> bool:
+        return path in self._rows
+    
+    def add_paths(self, paths: List[str]):
+        """Append paths not already in the list, as a single model update."""
+        new_paths = [path for path in dict.fromkeys(paths) if path not in self._rows]
+        if not new_paths:
+            return
+        first = len(self._paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_paths) - 1)
+        for row, path in enumerate(new_paths, first):
+            self._paths.append(path)
+            self._rows[path] = row
+        self.endInsertRows()
+    
+    def remove_path(self, path: str):
+        row = self._rows.get(path)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._paths[row]
+        del self._rows[path]
+        for i in range(row, len(self._paths)):  # Only the rows after the removed one moved
+            self._rows[self._paths[i]] = i
+        self._duplicates.pop(path, None)
+        self.endRemoveRows()
+    
+    def clear(self):
+        self.beginResetModel()
+        self._paths = []
+        self._rows = {}
+        self._duplicates = {}
+        self.endResetModel()
+    
+    def set_duplicates(self, duplicates: dict):
+        self._duplicates = {path: original for path, original in duplicates.items() if path in self._rows}
+        if self._paths:
+            self.dataChanged.emit(self.index(0), self.index(len(self._paths) - 1),
+                                  [Qt.ItemDataRole.ToolTipRole, self.DuplicateOfRole])
+    
+    def _on_thumbnail_ready(self, path: str):
+        row = self._rows.get(path)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class ImageThumbnailDelegate(QStyledItemDelegate):
+    """Paints a thumbnail card with a remove button and file name."""
+    
+    removeClicked = pyqtSignal(str)  # Emits the image path when remove is clicked
+    
+    CARD_SIZE = QSize(75, 90)
+    IMAGE_RECT = QRect(2, 2, 70, 60)  # Relative to the card
+    REMOVE_RECT = QRect(52, 4, 18, 18)
+    
+    def sizeHint(self, option, index) -> QSize:
+        return self.CARD_SIZE
+    
+    def paint(self, painter: QPainter, option, index: QModelIndex):
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        card = QRect(option.rect.topLeft(), self.CARD_SIZE).adjusted(0, 0, -1, -1)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        
+        painter.setPen(QPen(QColor("#00ffd5" if hovered else "#2d2d44"), 1))
+        painter.setBrush(QColor("#12121a"))
+        painter.drawRoundedRect(card, 8, 8)
+        
+        image_rect = self.IMAGE_RECT.translated(option.rect.topLeft())
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor("#0a0a0f"))
+        painter.drawRoundedRect(image_rect, 4, 4)
+        
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        if pixmap is not None and not pixmap.isNull():
+            target = QRect(QPoint(0, 0), pixmap.size())
+            target.moveCenter(image_rect.center())
+            painter.drawPixmap(target, pixmap)
+        else:
+            # Still decoding, or unreadable
+            painter.setPen(QColor("#7a7a8c"))
+            painter.drawText(image_rect, Qt.AlignmentFlag.AlignCenter, "…" if pixmap is None else "?")
+        
+        if hovered:
+            remove_rect = self.REMOVE_RECT.translated(option.rect.topLeft())
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(255, 107, 107, 230))
+            painter.drawEllipse(remove_rect)
+            painter.setPen(QColor("white"))
+            font = QFont(option.font)
+            font.setPixelSize(12)
+            font.setBold(True)
+            painter.setFont(font)
+            painter.drawText(remove_rect, Qt.AlignmentFlag.AlignCenter, "×")
+        
+        duplicate = index.data(ImageListModel.DuplicateOfRole)
+        filename = index.data(Qt.ItemDataRole.DisplayRole)
+        font = QFont(option.font)
+        font.setPixelSize(8)
+        font.setBold(bool(duplicate))
+        painter.setFont(font)
+        painter.setPen(QColor("#ffaa00" if duplicate else "#7a7a8c"))
+        label = "≈ duplicate" if duplicate else (filename[:10] + ".." if len(filename) > 10 else filename)
+        name_rect = QRect(card.left(), image_rect.bottom() + 2, card.width(), card.bottom() - image_rect.bottom() - 2)
+        painter.drawText(name_rect, Qt.AlignmentFlag.AlignCenter, label)
+        painter.restore()
+    
+    def editorEvent(self, event, model, option, index) -> bool:
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and self.REMOVE_RECT.translated(option.rect.topLeft()).contains(event.position().toPoint())):
+            self.removeClicked.emit(index.data(ImageListModel.PathRole))
+            return True
+        return super().editorEvent(event, model, option, index)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -909,13 +4213,17 @@ class ImageThumbnail(QFrame):
 # ═══════════════════════════════════════════════════════════════════════════════
 
 class MultiImagePreview(QFrame):
-    """Widget to display multiple image thumbnails in a scrollable area."""
+    """Horizontal, virtualized strip of image thumbnails.
+    
+    Backed by a QListView, so only visible items are painted and decoded -
+    the strip stays responsive with thousands of images.
+    """
     
     imageRemoved = pyqtSignal(str)
     
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.thumbnails = {}
+        self.model = ImageListModel(self)
         self.setFixedHeight(90)
         self.setStyleSheet("""
             QFrame {
@@ -938,62 +4246,50 @@ class MultiImagePreview(QFrame):
         self.count_label.setFixedWidth(35)
         main_layout.addWidget(self.count_label)
         
-        # Scroll area for thumbnails
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.scroll.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.scroll.setStyleSheet("""
-            QScrollArea {
+        # Thumbnail list - a single row that scrolls horizontally
+        self.delegate = ImageThumbnailDelegate(self)
+        self.delegate.removeClicked.connect(self._on_remove_clicked)
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setFlow(QListView.Flow.LeftToRight)
+        self.list_view.setWrapping(False)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSpacing(3)
+        self.list_view.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.list_view.setHorizontalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        self.list_view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.list_view.setMouseTracking(True)
+        self.list_view.setStyleSheet("""
+            QListView {
                 background: transparent;
                 border: none;
             }
         """)
-        
-        # Container widget
-        self.container = QWidget()
-        self.container_layout = QHBoxLayout(self.container)
-        self.container_layout.setContentsMargins(0, 0, 0, 0)
-        self.container_layout.setSpacing(6)
-        self.container_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        self.list_view.hide()
+        main_layout.addWidget(self.list_view)
         
         # Placeholder label
         self.placeholder = QLabel("No images yet - drop or click above")
         self.placeholder.setStyleSheet("color: #aaaacc; font-size: 12px;")
         self.placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.container_layout.addWidget(self.placeholder)
+        main_layout.addWidget(self.placeholder, 1)
         
-        self.scroll.setWidget(self.container)
-        main_layout.addWidget(self.scroll)
+        self.model.rowsInserted.connect(self._update_count)
+        self.model.rowsRemoved.connect(self._update_count)
+        self.model.modelReset.connect(self._update_count)
     
     def add_image(self, image_path: str):
         """Add an image thumbnail."""
-        if image_path in self.thumbnails:
-            return  # Already exists
-        
-        # Hide placeholder if this is the first image
-        if self.placeholder.isVisible():
-            self.placeholder.hide()
-        
-        # Create thumbnail
-        thumbnail = ImageThumbnail(image_path)
-        thumbnail.removeClicked.connect(self._on_remove_clicked)
-        
-        self.thumbnails[image_path] = thumbnail
-        self.container_layout.addWidget(thumbnail)
-        self._update_count()
+        self.model.add_paths([image_path])
+    
+    def add_images(self, image_paths: List[str]):
+        """Add several thumbnails in one model update (and one layout pass)."""
+        self.model.add_paths(image_paths)
     
     def remove_image(self, image_path: str):
         """Remove an image thumbnail."""
-        if image_path in self.thumbnails:
-            thumbnail = self.thumbnails.pop(image_path)
-            self.container_layout.removeWidget(thumbnail)
-            thumbnail.deleteLater()
-            self._update_count()
-            
-            # Show placeholder if no images left
-            if not self.thumbnails:
-                self.placeholder.show()
+        self.model.remove_path(image_path)
     
     def _on_remove_clicked(self, image_path: str):
         """Handle remove button click."""
@@ -1001,19 +4297,23 @@ class MultiImagePreview(QFrame):
         self.imageRemoved.emit(image_path)
     
     def _update_count(self):
-        """Update the image count label."""
-        count = len(self.thumbnails)
+        """Update the image count label and swap in the placeholder when empty."""
+        count = self.model.rowCount()
         self.count_label.setText(f"📷\n{count}")
+        self.list_view.setVisible(count > 0)
+        self.placeholder.setVisible(count == 0)
     
     def clear(self):
         """Remove all thumbnails."""
-        for path in list(self.thumbnails.keys()):
-            self.remove_image(path)
-        self.placeholder.show()
+        self.model.clear()
     
     def get_image_paths(self) -> List[str]:
         """Get all image paths."""
-        return list(self.thumbnails.keys())
+        return self.model.paths()
+    
+    def set_duplicates(self, duplicates: dict):
+        """Mark near-duplicate thumbnails, given a {duplicate: original} map."""
+        self.model.set_duplicates(duplicates)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1068,11 +4368,41 @@ class AndroidTestCaseGenerator(QMainWindow):
     
     def __init__(self):
         super().__init__()
-        self.image_paths: List[str] = []  # Changed to list
+        self.image_paths: dict = {}  # Selected images in order -> selection number
+        self._image_numbers = itertools.count()
+        self.image_hashes: dict = {}  # path -> perceptual hash
+        self.duplicate_images: dict = {}  # near-duplicate path -> original path
+        self._hash_workers: List[ImageHashWorker] = []
+        self._pending_hash_paths: List[str] = []
+        self._duplicates_refresh_pending = False
+        self._duplicates_generation = 0  # Bumped on clear so stale changes are dropped
+        self._duplicate_detector = DuplicateDetector()
+        self._duplicate_detector.changed.connect(self._on_duplicates_changed)
+        # Through a lambda so stop() runs here, not queued to the detector's own thread
+        QApplication.instance().aboutToQuit.connect(lambda: self._duplicate_detector.stop())
+        self._scan_workers: List[ImageScanWorker] = []
         self.video_path: Optional[str] = None
         self.document_path: Optional[str] = None
+        self._doc_worker: Optional[DocumentParseWorker] = None  # Parse whose result we still want
+        self._doc_workers: List[DocumentParseWorker] = []  # Kept alive until their threads exit
         self.document_content: Optional[str] = None
-        self.worker: Optional[GeminiWorker] = None
+        self.document_lazy = False  # Large text file read by the worker instead of document_content
+        self.document_encoding = "utf-8"
+        self.document_index: Optional[SectionIndex] = None
+        self.scheduler = JobScheduler(parent=self)
+        self.scheduler.queueChanged.connect(self._refresh_queue_view)
+        self.scheduler.jobProgress.connect(self._on_progress)
+        self.scheduler.jobChunk.connect(self._on_generation_chunk)
+        self.scheduler.jobStreamRestarted.connect(self._on_stream_restarted)
+        self.scheduler.jobStatus.connect(self._on_job_status)
+        self.scheduler.jobPreflight.connect(self._on_job_preflight)
+        self.scheduler.jobCancelled.connect(self._on_generation_cancelled)
+        self._preflight_workers: List[GeminiWorker] = []  # Kept alive until their threads exit
+        self._stream_sections: dict = {}  # Fan-out test type -> streamed text parts, in display order
+        self._sections_render_pending = False
+        self.scheduler.jobFinished.connect(self._on_generation_complete)
+        self.scheduler.jobFailed.connect(self._on_generation_error)
+        self.active_job: Optional[GenerationJob] = None  # Job shown in the results pane
         self.input_mode = "image"  # "image", "document", "combined", "video"
         self.is_premium = False  # IAP status
         
@@ -1295,8 +4625,14 @@ class AndroidTestCaseGenerator(QMainWindow):
             "Integration Testing",
             "Performance Testing",
             "Security Testing",
-            "Accessibility Testing"
+            "Accessibility Testing",
+            FAN_OUT_LABEL
         ])
+        self.test_type_combo.setItemData(
+            self.test_type_combo.count() - 1,
+            "Generate every test type concurrently and merge them into one suite",
+            Qt.ItemDataRole.ToolTipRole
+        )
         options_layout.addWidget(type_label, 0, 0)
         options_layout.addWidget(self.test_type_combo, 0, 1)
         
@@ -1316,6 +4652,80 @@ class AndroidTestCaseGenerator(QMainWindow):
         options_layout.addWidget(self.include_automation, 2, 0)
         options_layout.addWidget(self.include_data, 2, 1)
         
+        self.stream_output = QCheckBox("Stream results as they arrive")
+        self.stream_output.setChecked(True)
+        options_layout.addWidget(self.stream_output, 3, 0)
+        
+        self.use_cache = QCheckBox("Reuse cached results")
+        self.use_cache.setChecked(True)
+        self.use_cache.setToolTip("Return a saved response when the inputs match a previous run")
+        options_layout.addWidget(self.use_cache, 3, 1)
+        
+        self.skip_duplicates = QCheckBox("Skip near-duplicate screenshots")
+        self.skip_duplicates.setChecked(True)
+        self.skip_duplicates.setToolTip("Don't send screenshots that look almost identical to an earlier one")
+        options_layout.addWidget(self.skip_duplicates, 4, 1)
+        
+        self.hedge_requests = QCheckBox("Hedge slow requests")
+        self.hedge_requests.setToolTip(
+            "Send a backup request when the first one is slower than 95% of recent requests "
+            "(non-streaming only, may use extra quota)"
+        )
+        options_layout.addWidget(self.hedge_requests, 4, 0)
+        
+        # Screenshot downscaling before upload
+        size_label = QLabel("Image Size:")
+        self.image_size_combo = QComboBox()
+        for text, max_edge in IMAGE_MAX_EDGE_OPTIONS:
+            self.image_size_combo.addItem(text, max_edge)
+        self.image_size_combo.setToolTip("Longest edge of screenshots sent to Gemini")
+        options_layout.addWidget(size_label, 5, 0)
+        options_layout.addWidget(self.image_size_combo, 5, 1)
+        
+        self.chunk_documents = QCheckBox("Split large documents into parts")
+        self.chunk_documents.setChecked(True)
+        self.chunk_documents.setToolTip(
+            "Generate test cases for each part of a large document in parallel, then merge them"
+        )
+        options_layout.addWidget(self.chunk_documents, 6, 0, 1, 2)
+        
+        budget_label = QLabel("Token Budget:")
+        self.token_budget_combo = QComboBox()
+        for text, budget in TOKEN_BUDGET_OPTIONS:
+            self.token_budget_combo.addItem(text, budget)
+        self.token_budget_combo.setToolTip(
+            "Max input tokens per request - larger requests are trimmed automatically"
+        )
+        options_layout.addWidget(budget_label, 7, 0)
+        options_layout.addWidget(self.token_budget_combo, 7, 1)
+        
+        self.context_cache_check = QCheckBox("Cache document on Gemini across test types")
+        self.context_cache_check.setChecked(True)
+        self.context_cache_check.setToolTip(
+            "Upload a large document and its images to a Gemini context cache once, "
+            f"then reuse it for each test type for up to {CONTEXT_CACHE_TTL // 60} minutes"
+        )
+        options_layout.addWidget(self.context_cache_check, 8, 0, 1, 2)
+        
+        self.focus_sections_check = QCheckBox("Send only sections relevant to App Context")
+        self.focus_sections_check.setChecked(False)
+        self.focus_sections_check.setToolTip(
+            "For large documents, rank sections against the app context and test type "
+            f"and send only the best matches (up to ~{RETRIEVAL_TOKEN_BUDGET:,} tokens). "
+            "Documents that will be split into parts are always sent whole"
+        )
+        options_layout.addWidget(self.focus_sections_check, 9, 0, 1, 2)
+        
+        self.incremental_check = QCheckBox("Regenerate only changed sections of a revised document")
+        self.incremental_check.setChecked(True)
+        self.incremental_check.setToolTip(
+            "Remember the sections behind each generated suite. When a new revision of the same "
+            "document is generated with the same test type and app context, only added or changed "
+            "sections are sent and existing test cases keep their TC IDs. Uncheck 'Reuse cached "
+            "results' to regenerate everything"
+        )
+        options_layout.addWidget(self.incremental_check, 10, 0, 1, 2)
+        
         layout.addWidget(options_group)
         
         # ═══════════════════════════════════════════════════════════════════
@@ -1329,6 +4739,13 @@ class AndroidTestCaseGenerator(QMainWindow):
         actions_layout.addWidget(self.clear_all_btn)
         
         actions_layout.addStretch()
+        
+        self.estimate_btn = QPushButton("📏 Estimate Request")
+        self.estimate_btn.setObjectName("addImageBtn")
+        self.estimate_btn.setToolTip("Show estimated tokens and latency without sending the request")
+        self.estimate_btn.clicked.connect(self._estimate_request)
+        actions_layout.addWidget(self.estimate_btn)
+        
         layout.addLayout(actions_layout)
         
         # Generate button
@@ -1338,10 +4755,70 @@ class AndroidTestCaseGenerator(QMainWindow):
         layout.addWidget(self.generate_btn)
         
         # Progress bar
+        progress_layout = QHBoxLayout()
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
         self.progress_bar.setTextVisible(False)
-        layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.progress_bar, 1)
+        
+        self.cancel_btn = QPushButton("⏹ Cancel")
+        self.cancel_btn.setObjectName("clearBtn")
+        self.cancel_btn.setToolTip("Stop this generation and free its slot for the next job")
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self._cancel_generation)
+        progress_layout.addWidget(self.cancel_btn)
+        layout.addLayout(progress_layout)
+        
+        # Pre-flight estimate
+        self.preflight_label = QLabel("")
+        self.preflight_label.setStyleSheet("color: #7a7a8c; font-size: 11px;")
+        self.preflight_label.setWordWrap(True)
+        self.preflight_label.hide()
+        layout.addWidget(self.preflight_label)
+        
+        # ═══════════════════════════════════════════════════════════════════
+        # JOB QUEUE
+        # ═══════════════════════════════════════════════════════════════════
+        queue_group = QGroupBox("Job Queue")
+        queue_layout = QVBoxLayout(queue_group)
+        
+        queue_btn_layout = QHBoxLayout()
+        self.queue_btn = QPushButton("+ Add to Batch Queue")
+        self.queue_btn.setObjectName("addImageBtn")
+        self.queue_btn.setToolTip("Queue a background job with the current inputs and options")
+        self.queue_btn.clicked.connect(self._queue_test_cases)
+        queue_btn_layout.addWidget(self.queue_btn)
+        
+        self.cancel_job_btn = QPushButton("⏹ Cancel Job")
+        self.cancel_job_btn.setObjectName("clearBtn")
+        self.cancel_job_btn.setToolTip("Cancel the selected queued or running job")
+        self.cancel_job_btn.clicked.connect(self._cancel_selected_job)
+        queue_btn_layout.addWidget(self.cancel_job_btn)
+        
+        self.queue_status = QLabel("No jobs")
+        self.queue_status.setStyleSheet("color: #7a7a8c; font-size: 11px;")
+        queue_btn_layout.addStretch()
+        queue_btn_layout.addWidget(self.queue_status)
+        queue_layout.addLayout(queue_btn_layout)
+        
+        self.queue_list = QListWidget()
+        self.queue_list.setMaximumHeight(120)
+        self.queue_list.setStyleSheet("""
+            QListWidget {
+                background: #12121a;
+                border: 1px solid #2d2d44;
+                border-radius: 6px;
+                font-size: 11px;
+            }
+            QListWidget::item:selected {
+                background: rgba(0, 255, 213, 0.2);
+                color: #00ffd5;
+            }
+        """)
+        self.queue_list.itemClicked.connect(self._on_queue_item_clicked)
+        queue_layout.addWidget(self.queue_list)
+        
+        layout.addWidget(queue_group)
         
         layout.addStretch()
         
@@ -1357,7 +4834,7 @@ class AndroidTestCaseGenerator(QMainWindow):
         
         # Drop zone
         self.image_drop = DropZone("image")
-        self.image_drop.fileDropped.connect(self._on_image_dropped)
+        self.image_drop.filesDropped.connect(self._on_images_dropped)
         layout.addWidget(self.image_drop)
         
         # Multi-image preview
@@ -1374,6 +4851,11 @@ class AndroidTestCaseGenerator(QMainWindow):
         add_more_btn.clicked.connect(self._browse_more_images)
         btn_row.addWidget(add_more_btn)
         
+        add_folder_btn = QPushButton("📁 Add Folder")
+        add_folder_btn.setObjectName("addImageBtn")
+        add_folder_btn.clicked.connect(self._browse_image_folder)
+        btn_row.addWidget(add_folder_btn)
+        
         clear_btn = QPushButton("Clear All")
         clear_btn.setObjectName("clearBtn")
         clear_btn.clicked.connect(self._clear_images)
@@ -1425,7 +4907,7 @@ class AndroidTestCaseGenerator(QMainWindow):
         image_layout = QVBoxLayout(image_group)
         
         self.combined_image_drop = DropZone("image")
-        self.combined_image_drop.fileDropped.connect(self._on_image_dropped)
+        self.combined_image_drop.filesDropped.connect(self._on_images_dropped)
         image_layout.addWidget(self.combined_image_drop)
         
         self.combined_image_preview = MultiImagePreview()
@@ -1438,6 +4920,10 @@ class AndroidTestCaseGenerator(QMainWindow):
         add_img_btn.setObjectName("addImageBtn")
         add_img_btn.clicked.connect(self._browse_more_images)
         img_btn_layout.addWidget(add_img_btn)
+        add_img_folder_btn = QPushButton("📁 Add Folder")
+        add_img_folder_btn.setObjectName("addImageBtn")
+        add_img_folder_btn.clicked.connect(self._browse_image_folder)
+        img_btn_layout.addWidget(add_img_folder_btn)
         img_btn_layout.addStretch()
         image_layout.addLayout(img_btn_layout)
         
@@ -1573,6 +5059,24 @@ class AndroidTestCaseGenerator(QMainWindow):
         
         layout.addWidget(info_frame)
         
+        # Ingestion mode
+        ingest_group = QGroupBox("Video Ingestion")
+        ingest_layout = QVBoxLayout(ingest_group)
+        
+        self.video_ingest_group = QButtonGroup(self)
+        self.video_full_radio = QRadioButton("🎬 Full video upload (most detail)")
+        self.video_keyframes_radio = QRadioButton("🖼️ Keyframes only (decoded locally, much smaller upload)")
+        self.video_full_radio.setChecked(True)
+        self.video_ingest_group.addButton(self.video_full_radio)
+        self.video_ingest_group.addButton(self.video_keyframes_radio)
+        if cv2 is None:
+            self.video_keyframes_radio.setEnabled(False)
+            self.video_keyframes_radio.setToolTip("Install opencv-python-headless to enable keyframe mode")
+        
+        ingest_layout.addWidget(self.video_full_radio)
+        ingest_layout.addWidget(self.video_keyframes_radio)
+        layout.addWidget(ingest_group)
+        
         # Buttons
         btn_layout = QHBoxLayout()
         btn_layout.setSpacing(8)
@@ -1822,13 +5326,17 @@ class AndroidTestCaseGenerator(QMainWindow):
         # Update status labels
         num_images = len(self.image_paths)
         if num_images > 0:
-            self.image_status.setText(f"📷 {num_images} image(s)")
+            num_duplicates = len(self.duplicate_images)
+            if num_duplicates:
+                self.image_status.setText(f"📷 {num_images} image(s) • {num_duplicates} duplicate(s)")
+            else:
+                self.image_status.setText(f"📷 {num_images} image(s)")
             self.image_status.setObjectName("statusActive")
         else:
             self.image_status.setText("📷 No images")
             self.image_status.setObjectName("statusInactive")
         
-        if self.document_content:
+        if self.document_content or self.document_lazy:
             filename = Path(self.document_path).name if self.document_path else "Document"
             self.doc_status.setText(f"📄 {filename[:20]}..." if len(filename) > 20 else f"📄 {filename}")
             self.doc_status.setObjectName("statusActive")
@@ -1862,28 +5370,123 @@ class AndroidTestCaseGenerator(QMainWindow):
     # EVENT HANDLERS
     # ═══════════════════════════════════════════════════════════════════════════
     
-    def _on_image_dropped(self, path: str):
-        """Handle image file drop."""
-        valid_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.bmp'}
-        ext = Path(path).suffix.lower()
+    def _on_images_dropped(self, paths: List[str]):
+        """Handle dropped or selected image files and folders.
+        
+        Files are checked by their magic bytes, so extension-less captures work.
+        Checking and folder scanning both happen in the background.
+        """
+        if paths:
+            self._scan_images(paths)
+    
+    def _add_images(self, paths: List[str]):
+        """Add new images to the selection and both previews as one batch."""
+        new_paths = []
+        for path in paths:
+            if path not in self.image_paths:
+                self.image_paths[path] = next(self._image_numbers)
+                new_paths.append(path)
+        if not new_paths:
+            return
         
-        if ext not in valid_extensions:
-            QMessageBox.warning(self, "Invalid File", "Please select a valid image file (PNG, JPG, JPEG, GIF, BMP).")
+        # Update all preview widgets
+        self.image_preview.add_images(new_paths)
+        self.combined_image_preview.add_images(new_paths)
+        
+        # Hash in the background; batch every image from the same drop
+        if not self._pending_hash_paths:
+            QTimer.singleShot(0, self._start_hashing)
+        self._pending_hash_paths.extend(new_paths)
+        
+        self._update_mode_ui()
+    
+    def _scan_images(self, paths: List[str]):
+        """Find images among files and folders in the background and add them as they're found."""
+        worker = ImageScanWorker(paths, self)
+        worker.found.connect(lambda images: self._on_scanned_images_found(worker, images))
+        worker.finished.connect(lambda: self._on_images_scanned(worker))
+        self._scan_workers.append(worker)
+        self.status_label.setText(f"Scanning {worker.label}...")
+        worker.start()
+    
+    def _on_scanned_images_found(self, worker: ImageScanWorker, paths: List[str]):
+        if worker.is_cancelled():
+            return  # Batch queued before the selection was cleared
+        self._add_images(paths)
+        self.status_label.setText(
+            f"Scanning {worker.label} • {len(self.image_paths)} image(s) selected"
+        )
+    
+    def _on_images_scanned(self, worker: ImageScanWorker):
+        self._scan_workers.remove(worker)
+        if worker.is_cancelled():
+            return
+        self.status_label.setText(
+            f"Checked {worker.scanned} file(s) from {worker.label} • "
+            f"{len(self.image_paths)} image(s) selected"
+        )
+        rejected = worker.rejected
+        if rejected:
+            QMessageBox.warning(
+                self, "Invalid File",
+                "Not a PNG, JPG, GIF or BMP image:\n" + "\n".join(rejected[:10])
+                + (f"\n…and {len(rejected) - 10} more" if len(rejected) > 10 else "")
+            )
+    
+    def _browse_image_folder(self):
+        """Pick a folder and import every image under it."""
+        folder = QFileDialog.getExistingDirectory(self, "Select Screenshot Folder")
+        if folder:
+            self._scan_images([folder])
+    
+    def _start_hashing(self):
+        """Start a background perceptual-hash job for newly added images."""
+        paths, self._pending_hash_paths = self._pending_hash_paths, []
+        paths = [p for p in paths if p in self.image_paths and p not in self.image_hashes]
+        if not paths:
             return
         
+        worker = ImageHashWorker(paths, self)
+        worker.hashed.connect(self._on_image_hashed)
+        worker.finished.connect(lambda: self._hash_workers.remove(worker))
+        self._hash_workers.append(worker)
+        worker.start()
+    
+    def _on_image_hashed(self, path: str, value: int):
+        """Store a computed hash and pass it to the duplicate detector."""
         if path not in self.image_paths:
-            self.image_paths.append(path)
-            
-            # Update all preview widgets
-            self.image_preview.add_image(path)
-            self.combined_image_preview.add_image(path)
-        
+            return  # Removed while hashing
+        self.image_hashes[path] = value
+        self._duplicate_detector.add(path, value, self.image_paths[path])
+    
+    def _on_duplicates_changed(self, generation: int, changes: dict):
+        """Apply duplicate status changes unless the selection was cleared since."""
+        if generation != self._duplicates_generation:
+            return
+        for path, original in changes.items():
+            if original is None:
+                self.duplicate_images.pop(path, None)
+            else:
+                self.duplicate_images[path] = original
+        # Coalesce the preview refresh while a large batch is being hashed
+        if not self._duplicates_refresh_pending:
+            self._duplicates_refresh_pending = True
+            QTimer.singleShot(100, self._refresh_duplicates)
+    
+    def _refresh_duplicates(self):
+        """Mark the current near-duplicates in both previews."""
+        self._duplicates_refresh_pending = False
+        self.image_preview.set_duplicates(self.duplicate_images)
+        self.combined_image_preview.set_duplicates(self.duplicate_images)
         self._update_mode_ui()
     
     def _on_image_removed(self, path: str):
         """Handle image removal from preview."""
         if path in self.image_paths:
-            self.image_paths.remove(path)
+            del self.image_paths[path]
+            self.image_hashes.pop(path, None)
+            self.duplicate_images.pop(path, None)
+            self._duplicate_detector.remove(path)
             
             # Sync both preview widgets
             self.image_preview.remove_image(path)
@@ -1897,68 +5500,118 @@ class AndroidTestCaseGenerator(QMainWindow):
         files, _ = QFileDialog.getOpenFileNames(
             self, "Select Images", "", file_filter
         )
-        for f in files:
-            self._on_image_dropped(f)
+        if files:
+            self._on_images_dropped(files)
     
     def _on_document_dropped(self, path: str):
-        """Handle document file drop."""
-        ext = Path(path).suffix.lower()
+        """Handle document file drop by parsing it in the background."""
+        if Path(path).suffix.lower() not in DOCUMENT_EXTENSIONS:
+            QMessageBox.warning(self, "Invalid File", "Please select a PDF, DOCX, TXT, or MD file.")
+            return
         
-        try:
-            if ext == '.pdf':
-                content = self._read_pdf(path)
-            elif ext == '.docx':
-                content = self._read_docx(path)
-            elif ext in {'.txt', '.md'}:
-                with open(path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            else:
-                QMessageBox.warning(self, "Invalid File", "Please select a PDF, DOCX, TXT, or MD file.")
-                return
-            
-            self.document_path = path
-            self.document_content = content
-            
-            # Update all relevant UI elements
-            preview_text = content[:2000] + "..." if len(content) > 2000 else content
-            
-            self.doc_drop.set_file(path)
-            self.doc_preview.setText(preview_text)
-            self.combined_doc_drop.set_file(path)
-            self.combined_doc_preview.setText(preview_text)
-            
-            self._update_mode_ui()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to read document: {str(e)}")
+        # A new drop supersedes a parse that is still running
+        if self._doc_worker is not None:
+            self._doc_worker.cancel()
+        
+        worker = DocumentParseWorker(path)
+        worker.progress.connect(self._on_document_progress)
+        worker.parsed.connect(self._on_document_parsed)
+        worker.failed.connect(self._on_document_failed)
+        worker.finished.connect(lambda: self._doc_workers.remove(worker))
+        self._doc_workers.append(worker)
+        self._doc_worker = worker
+        
+        self.doc_drop.set_loading(path)
+        self.combined_doc_drop.set_loading(path)
+        self.status_label.setText(f"Reading • {Path(path).name}")
+        worker.start()
     
-    def _read_pdf(self, path: str) -> str:
-        """Extract text from PDF."""
-        text = []
-        with open(path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text.append(page_text)
-        return '\n'.join(text)
-    
-    def _read_docx(self, path: str) -> str:
-        """Extract text from DOCX."""
-        doc = docx.Document(path)
-        return '\n'.join([para.text for para in doc.paragraphs if para.text])
+    def _on_document_progress(self, done: int, total: int):
+        """Show parsing progress in the drop zones."""
+        worker = self.sender()
+        if worker is not self._doc_worker or total <= 1:
+            return
+        detail = f"{done:,} / {total:,} pages"
+        self.doc_drop.set_loading(worker.path, detail)
+        self.combined_doc_drop.set_loading(worker.path, detail)
+        self.status_label.setText(f"Reading • {Path(worker.path).name} • {detail}")
+    
+    def _on_document_parsed(self, path: str, document: dict):
+        """Fill in the document once parsing finishes."""
+        if self.sender() is not self._doc_worker:
+            return
+        self._doc_worker = None
+        content = document["text"]
+        
+        self.document_path = path
+        self.document_content = content
+        self.document_lazy = content is None
+        self.document_encoding = document.get("encoding", "utf-8")
+        self.document_index = document.get("index")
+        
+        # Update all relevant UI elements
+        if content is None:
+            preview_text = document["preview"][:TEXT_PREVIEW_CHARS] + "..."
+        else:
+            preview_text = content[:TEXT_PREVIEW_CHARS] + "..." if len(content) > TEXT_PREVIEW_CHARS else content
+        
+        self.doc_drop.set_file(path)
+        self.doc_preview.setText(preview_text)
+        self.combined_doc_drop.set_file(path)
+        self.combined_doc_preview.setText(preview_text)
+        
+        self._update_mode_ui()
+        if content is None:
+            size_mb = os.path.getsize(path) / 1e6
+            status = f"Ready • {Path(path).name} ({size_mb:,.0f} MB, {self.document_encoding}) will be read when generating"
+        else:
+            status = f"Ready • {Path(path).name} loaded ({len(content):,} characters)"
+        if document.get("from_cache"):
+            status += " from cache"
+        issues = describe_page_issues(document)
+        if issues:
+            status += f" • ⚠ {issues}"
+        self.status_label.setText(status)
+        for drop in (self.doc_drop, self.combined_doc_drop):
+            drop.setToolTip(f"⚠ {issues}" if issues else "")
+    
+    def _on_document_failed(self, path: str, error: str):
+        if self.sender() is not self._doc_worker:
+            return
+        self._doc_worker = None
+        
+        # Fall back to the previously loaded document, if any
+        if self.document_path:
+            self.doc_drop.set_file(self.document_path)
+            self.combined_doc_drop.set_file(self.document_path)
+        else:
+            self.doc_drop.reset()
+            self.combined_doc_drop.reset()
+        self.status_label.setText("Ready")
+        QMessageBox.critical(self, "Error", f"Failed to read document: {error}")
     
     def _clear_images(self):
         """Clear all selected images."""
-        self.image_paths = []
+        for worker in self._scan_workers:
+            worker.cancel()
+        self.image_paths = {}
+        self.image_hashes = {}
+        self.duplicate_images = {}
+        self._duplicates_generation += 1  # Ignore changes still queued
+        self._duplicate_detector.reset(self._duplicates_generation)
         self.image_preview.clear()
         self.combined_image_preview.clear()
         self._update_mode_ui()
     
     def _clear_document(self):
         """Clear the selected document."""
+        if self._doc_worker is not None:
+            self._doc_worker.cancel()
+            self._doc_worker = None
         self.document_path = None
         self.document_content = None
+        self.document_lazy = False
+        self.document_index = None
         self.doc_preview.clear()
         self.combined_doc_preview.clear()
         self.doc_drop.reset()
@@ -1975,83 +5628,324 @@ class AndroidTestCaseGenerator(QMainWindow):
         self.export_btn.setEnabled(False)
         self.copy_btn.setEnabled(False)
     
-    def _generate_test_cases(self):
-        """Start test case generation."""
+    def _validate_inputs(self) -> Optional[str]:
+        """Validate inputs for the current mode and return the API key, or None."""
         # Validate API key
         api_key = self.api_key_input.text().strip()
         if not api_key:
             QMessageBox.warning(self, "API Key Required", "Please enter your Gemini API key.")
-            return
+            return None
+        
+        if self._doc_worker is not None and self.input_mode in ("document", "combined"):
+            QMessageBox.information(self, "Document Loading", "Please wait until the document has finished loading.")
+            return None
         
         # Validate inputs based on mode
         if self.input_mode == "image" and not self.image_paths:
             QMessageBox.warning(self, "Images Required", "Please upload at least one image (screenshot) for Image Only mode.")
-            return
+            return None
         
-        if self.input_mode == "document" and not self.document_content:
+        has_document = bool(self.document_content) or self.document_lazy
+        if self.input_mode == "document" and not has_document:
             QMessageBox.warning(self, "Document Required", "Please upload a document for Document Only mode.")
-            return
+            return None
         
         if self.input_mode == "combined":
-            if not self.image_paths and not self.document_content:
+            if not self.image_paths and not has_document:
                 QMessageBox.warning(self, "Input Required", "Please upload at least an image or document for Combined mode.")
-                return
+                return None
         
         if self.input_mode == "video":
             if not self.is_premium:
                 self._show_iap_dialog()
-                return
+                return None
             if not self.video_path:
                 QMessageBox.warning(self, "Video Required", "Please upload a video for Video mode.")
-                return
-        
-        # Disable button and show progress
-        self.generate_btn.setEnabled(False)
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setValue(0)
-        self.results_text.clear()
-        self.results_text.setPlaceholderText("🔄 Generating test cases with Gemini AI...")
-        self.status_label.setText("Processing • Generating test cases...")
+                return None
         
-        # Start worker thread
-        self.worker = GeminiWorker(
+        return api_key
+    
+    def _create_worker(self, api_key: str, **overrides) -> GeminiWorker:
+        """Create a worker from the current inputs and options."""
+        options = dict(
             api_key=api_key,
-            image_paths=self.image_paths if self.input_mode in ("image", "combined") else [],
+            image_paths=list(self.image_paths) if self.input_mode in ("image", "combined") else [],
             document_content=self.document_content if self.input_mode in ("document", "combined") else None,
+            document_path=self.document_path if self.document_lazy and self.input_mode in ("document", "combined") else None,
+            document_encoding=self.document_encoding,
+            focus_sections=self.focus_sections_check.isChecked(),
+            document_index=self.document_index,
+            history_path=self.document_path,
+            incremental=self.incremental_check.isChecked(),
             video_path=self.video_path if self.input_mode == "video" else None,
             test_type=self.test_type_combo.currentText(),
             app_context=self.context_input.text(),
-            input_mode=self.input_mode
+            input_mode=self.input_mode,
+            stream=self.stream_output.isChecked(),
+            use_cache=self.use_cache.isChecked(),
+            hedge=self.hedge_requests.isChecked(),
+            image_max_edge=self.image_size_combo.currentData(),
+            image_hashes=self.image_hashes,
+            dedupe_threshold=DUPLICATE_HASH_THRESHOLD if self.skip_duplicates.isChecked() else None,
+            video_ingest="keyframes" if self.video_keyframes_radio.isChecked() else "upload",
+            chunked=self.chunk_documents.isChecked(),
+            token_budget=self.token_budget_combo.currentData(),
+            context_cache=self.context_cache_check.isChecked(),
+            fan_out=FAN_OUT_TEST_TYPES if self.test_type_combo.currentText() == FAN_OUT_LABEL else None
+        )
+        options.update(overrides)
+        return GeminiWorker(**options)
+    
+    def _job_label(self) -> str:
+        """Short label describing the current inputs for the queue view."""
+        context = self.context_input.text().strip()
+        label = self.test_type_combo.currentText().split(" (")[0]
+        return f"{label} • {context}" if context else label
+    
+    def _generate_test_cases(self):
+        """Submit an interactive generation job and show it in the results pane."""
+        api_key = self._validate_inputs()
+        if not api_key:
+            return
+        
+        job = self.scheduler.submit(
+            self._create_worker(api_key), self._job_label(), GenerationJob.PRIORITY_INTERACTIVE
+        )
+        self.active_job = job
+        
+        # Show progress for the new job
+        self._set_progress_visible(True)
+        self.progress_bar.setValue(0)
+        self._reset_results()
+        self.results_text.setPlaceholderText("🔄 Generating test cases with Gemini AI...")
+        self.status_label.setText(f"Processing • Job #{job.id} generating test cases...")
+    
+    def _queue_test_cases(self):
+        """Submit a low-priority batch job with the current inputs."""
+        api_key = self._validate_inputs()
+        if not api_key:
+            return
+        
+        job = self.scheduler.submit(
+            self._create_worker(api_key), self._job_label(), GenerationJob.PRIORITY_BATCH
         )
-        self.worker.finished.connect(self._on_generation_complete)
-        self.worker.error.connect(self._on_generation_error)
-        self.worker.progress.connect(self._on_progress)
-        self.worker.start()
+        self.status_label.setText(f"Queued • Batch job #{job.id} added")
+    
+    def _estimate_request(self):
+        """Run a pre-flight estimate for the current inputs without generating."""
+        api_key = self._validate_inputs()
+        if not api_key:
+            return
+        
+        worker = self._create_worker(api_key, dry_run=True, use_cache=False, stream=False)
+        worker.preflight_ready.connect(self._on_preflight_ready)
+        worker.error.connect(self._on_preflight_error)
+        # preflight_ready fires before run() returns, so earlier estimates may still be running
+        self._preflight_workers = [w for w in self._preflight_workers if w.isRunning()] + [worker]
+        self.estimate_btn.setEnabled(False)
+        self.preflight_label.setText("📏 Estimating request size...")
+        self.preflight_label.show()
+        worker.start()
+    
+    def _on_preflight_ready(self, preflight: dict):
+        """Show the result of an Estimate Request run."""
+        self.estimate_btn.setEnabled(True)
+        self.preflight_label.setText(f"📏 {format_preflight(preflight)}")
+    
+    def _on_preflight_error(self, error: str):
+        self.estimate_btn.setEnabled(True)
+        self.preflight_label.setText(f"📏 Estimate failed: {error}")
+    
+    def _on_job_preflight(self, job: GenerationJob, preflight: dict):
+        """Show the pre-flight estimate of the active job."""
+        if job is self.active_job:
+            self.preflight_label.setText(f"📏 {format_preflight(preflight)}")
+            self.preflight_label.show()
+    
+    def _refresh_queue_view(self):
+        """Rebuild the job queue list from the scheduler state."""
+        self.queue_list.clear()
+        for job in reversed(self.scheduler.jobs):
+            item = QListWidgetItem(job.describe())
+            item.setData(Qt.ItemDataRole.UserRole, job.id)
+            self.queue_list.addItem(item)
+            if job is self.active_job:
+                item.setSelected(True)
+        
+        running = sum(1 for job in self.scheduler.jobs if job.status == "running")
+        if self.scheduler.jobs:
+            self.queue_status.setText(f"{running} running • {self.scheduler.pending_count()} queued")
+        else:
+            self.queue_status.setText("No jobs")
+    
+    def _on_queue_item_clicked(self, item: QListWidgetItem):
+        """Show the selected job's output in the results pane."""
+        job_id = item.data(Qt.ItemDataRole.UserRole)
+        job = next((j for j in self.scheduler.jobs if j.id == job_id), None)
+        if job is None:
+            return
+        
+        self.active_job = job
+        self._reset_results()
+        if job.status == "done":
+            self._on_generation_complete(job)
+        elif job.status == "failed":
+            self._set_progress_visible(False)
+            self.results_text.setPlaceholderText(f"❌ Job #{job.id} failed: {job.error}")
+        elif job.status == "cancelled":
+            self._set_progress_visible(False)
+            self.results_text.setPlaceholderText(f"⊘ Job #{job.id} was cancelled")
+        else:
+            self._set_progress_visible(job.status == "running")
+            self.results_text.setPlaceholderText(f"🔄 Job #{job.id} is {job.status}...")
+    
+    def _set_progress_visible(self, visible: bool):
+        """Show or hide the progress bar together with its Cancel button."""
+        self.progress_bar.setVisible(visible)
+        self.cancel_btn.setVisible(visible)
+        self.cancel_btn.setEnabled(True)
+    
+    def _cancel_generation(self):
+        """Cancel the job shown in the results pane."""
+        if self.active_job is None:
+            return
+        self.scheduler.cancel(self.active_job)
+        self.cancel_btn.setEnabled(False)
+        self.status_label.setText(f"Cancelling • Stopping job #{self.active_job.id}...")
+    
+    def _cancel_selected_job(self):
+        """Cancel the job selected in the queue list."""
+        item = self.queue_list.currentItem()
+        if item is None:
+            return
+        job_id = item.data(Qt.ItemDataRole.UserRole)
+        job = next((j for j in self.scheduler.jobs if j.id == job_id), None)
+        if job is not None:
+            self.scheduler.cancel(job)
     
-    def _on_progress(self, value: int):
+    def _on_generation_cancelled(self, job: GenerationJob):
+        """Handle a cancelled job."""
+        if job is not self.active_job:
+            self.status_label.setText(f"Cancelled • Job #{job.id} was cancelled")
+            return
+        
+        self._set_progress_visible(False)
+        if not self.results_text.toPlainText():
+            self.results_text.setPlaceholderText(f"⊘ Job #{job.id} was cancelled")
+        self.status_label.setText(f"Cancelled • Job #{job.id} stopped")
+    
+    def _on_progress(self, job: GenerationJob, value: int):
         """Update progress bar."""
-        self.progress_bar.setValue(value)
+        if job is self.active_job:
+            self.progress_bar.setValue(value)
+    
+    def _on_generation_chunk(self, job: GenerationJob, section: str, text: str):
+        """Append a streamed chunk to the results pane, or to its test type's section."""
+        if job is not self.active_job:
+            return
+        if section:
+            self._stream_sections.setdefault(section, []).append(text)
+            self._schedule_sections_render()
+            return
+        self.results_text.moveCursor(QTextCursor.MoveOperation.End)
+        self.results_text.insertPlainText(text)
+        self.results_text.ensureCursorVisible()
+    
+    def _on_stream_restarted(self, job: GenerationJob, section: str):
+        """Discard partial streamed output before the worker retries."""
+        if job is not self.active_job:
+            return
+        if section:
+            self._stream_sections[section] = []
+            self._schedule_sections_render()
+        else:
+            self.results_text.clear()
+    
+    def _schedule_sections_render(self):
+        # Coalesce redraws while several test types stream at once
+        if not self._sections_render_pending:
+            self._sections_render_pending = True
+            QTimer.singleShot(100, self._render_stream_sections)
+    
+    def _render_stream_sections(self):
+        """Redraw the results pane with one section per streaming test type."""
+        self._sections_render_pending = False
+        if not self._stream_sections:
+            return  # Reset by a new active job
+        scrollbar = self.results_text.verticalScrollBar()
+        position = scrollbar.value()
+        self.results_text.setPlainText("\n".join(
+            f"── {section} ──\n{''.join(parts)}\n" for section, parts in self._stream_sections.items()
+        ))
+        scrollbar.setValue(position)
     
-    def _on_generation_complete(self, result: str):
+    def _reset_results(self):
+        """Clear the results pane for a newly shown job."""
+        self._stream_sections = {}
+        self.results_text.clear()
+    
+    def _on_job_status(self, job: GenerationJob, message: str):
+        """Show retry and hedging updates from the active job."""
+        if job is self.active_job:
+            self.status_label.setText(message)
+    
+    def _on_generation_complete(self, job: GenerationJob):
         """Handle successful generation."""
-        self.results_text.setText(result)
-        self.progress_bar.setVisible(False)
-        self.generate_btn.setEnabled(True)
+        if job is not self.active_job:
+            self.status_label.setText(f"Complete • Job #{job.id} finished in the background")
+            return
+        
+        result = job.result
+        self._stream_sections = {}  # The merged suite replaces the per-type sections
+        # Streamed runs already have the full text in the pane
+        if self.results_text.toPlainText() != result:
+            self.results_text.setText(result)
+        self._set_progress_visible(False)
         self.export_btn.setEnabled(True)
         self.copy_btn.setEnabled(True)
         
         # Count test cases
-        tc_count = result.count("### Test Case")
+        tc_count = len(extract_test_case_blocks(result))
         timestamp = datetime.now().strftime("%H:%M:%S")
-        num_images = len(self.image_paths)
-        self.stats_label.setText(f"✓ Generated {tc_count} test cases from {num_images} image(s) • {len(result):,} characters • {timestamp}")
+        num_images = len(job.worker.image_paths)
+        if job.worker.chunk_count > 1:
+            timestamp += f" • merged from {job.worker.chunk_count} document parts"
+        if job.worker.fan_out:
+            timestamp += f" • merged from {len(job.worker.fan_out)} test types"
+        if job.worker.focused_sections:
+            timestamp += " • {} of {} document sections".format(*job.worker.focused_sections)
+        if job.worker.incremental_plan:
+            plan = job.worker.incremental_plan
+            timestamp += f" • {len(plan['changed'])} of {plan['sections']} sections regenerated, {len(plan['reused'])} test cases reused"
+        skipped = len(job.worker.skipped_duplicates)
+        if skipped:
+            timestamp += f" • {skipped} duplicate image(s) skipped"
+        unreadable = len(job.worker.skipped_unreadable)
+        if unreadable:
+            timestamp += f" • {unreadable} unreadable image(s) skipped"
+        if job.worker.from_cache:
+            source = " • from cache"
+        else:
+            attempts = job.worker.attempts
+            latency = attempts[-1]["latency"] if attempts else 0.0
+            source = f" • {len(attempts)} attempt(s) • {latency:.1f}s"
+            if job.worker.cached_context:
+                source += " • context cached" if job.worker.created_context else " • cached context reused"
+        self.stats_label.setText(f"✓ Generated {tc_count} test cases from {num_images} image(s) • {len(result):,} characters • {timestamp}{source}")
         self.status_label.setText(f"Complete • {tc_count} test cases generated successfully")
     
-    def _on_generation_error(self, error: str):
+    def _on_generation_error(self, job: GenerationJob):
         """Handle generation error."""
-        self.progress_bar.setVisible(False)
-        self.generate_btn.setEnabled(True)
-        QMessageBox.critical(self, "Generation Failed", f"Error: {error}")
+        if job is not self.active_job:
+            self.status_label.setText(f"Error • Background job #{job.id} failed")
+            return
+        
+        self._set_progress_visible(False)
+        attempts = len(job.worker.attempts)
+        if attempts > 1:
+            QMessageBox.critical(self, "Generation Failed", f"Error after {attempts} attempts: {job.error}")
+        else:
+            QMessageBox.critical(self, "Generation Failed", f"Error: {job.error}")
         self.results_text.setPlaceholderText(
             "❌ Generation failed. Please check:\n\n"
             "• Your API key is valid\n"
@@ -2100,7 +5994,7 @@ class AndroidTestCaseGenerator(QMainWindow):
                     "image_sources": [Path(p).name for p in self.image_paths],
                     "document_source": Path(self.document_path).name if self.document_path else None,
                     "test_cases_raw": content,
-                    "test_case_count": content.count("### Test Case")
+                    "test_case_count": len(extract_test_case_blocks(content))
                 }
                 with open(file_path, 'w', encoding='utf-8') as f:
                     json.dump(data, f, indent=2, ensure_ascii=False)
@@ -2273,6 +6167,7 @@ class AndroidTestCaseGenerator(QMainWindow):
 def main():
     app = QApplication(sys.argv)
     app.setStyleSheet(STYLESHEET)
+    app.aboutToQuit.connect(shutdown_process_pool)
     
     # Set application properties
     app.setApplicationName("Android Test Case Generator")
@@ -0,0 +1,84 @@
+from main import chunk_document, extract_test_case_blocks, merge_test_suites, split_sections
+
+
+def make_case(number, name, steps="1. Open the app"):
+    return (
+        f"{'─' * 78}\n"
+        f"TEST CASE ID: TC-{number:03d}\n"
+        f"TEST CASE NAME: {name}\n"
+        f"STEPS:\n{steps}\n"
+    )
+
+
+def make_suite(*cases, title="Login"):
+    divider = "═" * 78
+    return f"{divider}\nTEST SUITE: {title}\n{divider}\n\n" + "\n".join(cases) + f"\n{divider}\n"
+
+
+def test_short_document_is_one_chunk():
+    text = "# Intro\nSome text.\n\n# Login\nMore text."
+    assert chunk_document(text, max_chars=1000) == [text]
+
+
+def test_sections_keep_their_headings():
+    text = "Preamble line\n# Intro\nIntro body\n## 1.1 Details\nDetail body\n\fAfter page break"
+    sections = split_sections(text)
+    assert sections[0] == "Preamble line\n"
+    assert sections[1].startswith("# Intro")
+    assert sections[2].startswith("## 1.1 Details")
+    assert sections[-1] == "After page break"
+
+
+def test_chunks_respect_the_size_limit_and_keep_all_text():
+    sections = [f"# Section {i}\n" + ("requirement text " * 20 + "\n") * (i % 5 + 1) for i in range(40)]
+    text = "\n".join(sections)
+    chunks = chunk_document(text, max_chars=1500)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 1500 for chunk in chunks)
+    assert "".join(chunks).split() == text.split()
+
+
+def test_oversized_section_is_split_at_lines():
+    body = "\n".join(f"line {i} " + "x" * 50 for i in range(100))
+    text = "# Huge\n" + body
+    chunks = chunk_document(text, max_chars=500)
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    assert "".join(chunks).split() == text.split()
+
+
+def test_unbroken_text_is_split_at_the_limit():
+    text = "y" * 2500
+    chunks = chunk_document(text, max_chars=1000)
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+
+
+def test_extract_blocks_with_and_without_dividers():
+    suite = make_suite(make_case(1, "Valid login"), "TEST CASE ID: TC-002\nTEST CASE NAME: Bad password\n")
+    blocks = extract_test_case_blocks(suite)
+    assert len(blocks) == 2
+    assert "Valid login" in blocks[0]
+    assert "Bad password" in blocks[1]
+    assert "TEST SUITE" not in blocks[1]
+
+
+def test_merge_drops_duplicates_and_renumbers():
+    first = make_suite(make_case(1, "Valid login"), make_case(2, "Bad password"))
+    second = make_suite(make_case(1, "valid  LOGIN!"), make_case(2, "Locked account"))
+    merged = merge_test_suites([first, second], "Combined")
+    blocks = extract_test_case_blocks(merged)
+    assert [block.count("TEST CASE NAME") for block in blocks] == [1, 1, 1]
+    assert "TEST SUITE: Combined" in merged
+    ids = [line.split(":", 1)[1].strip() for line in merged.splitlines() if line.startswith("TEST CASE ID")]
+    assert ids == ["TC-001", "TC-002", "TC-003"]
+    assert "Locked account" in blocks[2]
+
+
+def test_merge_numbers_from_start_number():
+    merged = merge_test_suites([make_suite(make_case(7, "Logout"))], "Later", start_number=12)
+    assert "TEST CASE ID: TC-012" in merged
+
+
+def test_merge_keeps_unparsed_output():
+    merged = merge_test_suites([make_suite(make_case(1, "Valid login")), "The model replied in prose."], "Mixed")
+    assert len(extract_test_case_blocks(merged)) == 1
+    assert "The model replied in prose." in merged
@@ -0,0 +1,70 @@
+import os
+
+from main import DocumentCache, file_sha256
+
+
+def parsed(text):
+    return {"text": text, "pages": 2, "page_offsets": [0, 5], "empty_pages": [], "failed_pages": {2: "bad font"}}
+
+
+def cache_document(cache, path):
+    key = DocumentCache.identity_key(str(path))
+    cache.store(key, file_sha256(str(path)), parsed(path.read_text()))
+    return key
+
+
+def test_unchanged_file_is_served_from_cache(tmp_path):
+    cache = DocumentCache(tmp_path / "cache")
+    spec = tmp_path / "spec.txt"
+    spec.write_text("hello")
+    cache_document(cache, spec)
+    document = cache.load(str(spec))
+    assert document["text"] == "hello"
+    assert document["failed_pages"] == {2: "bad font"}  # Integer page numbers survive JSON
+
+
+def test_edited_file_misses(tmp_path):
+    cache = DocumentCache(tmp_path / "cache")
+    spec = tmp_path / "spec.txt"
+    spec.write_text("hello")
+    cache_document(cache, spec)
+    spec.write_text("hello, world")
+    assert cache.load(str(spec)) is None
+
+
+def test_same_size_and_mtime_with_new_bytes_is_stale(tmp_path):
+    cache = DocumentCache(tmp_path / "cache")
+    spec = tmp_path / "spec.txt"
+    spec.write_text("hello")
+    stat = spec.stat()
+    key = cache_document(cache, spec)
+    spec.write_text("jello")
+    os.utime(spec, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert DocumentCache.identity_key(str(spec)) == key
+    assert cache.load(str(spec)) is None
+    assert not any((tmp_path / "cache").iterdir())
+
+
+def test_least_recently_used_documents_are_evicted(tmp_path):
+    cache_dir = tmp_path / "cache"
+    probe = DocumentCache(cache_dir)
+    specs = []
+    for i in range(3):
+        spec = tmp_path / f"spec{i}.txt"
+        spec.write_text(os.urandom(2000).hex())  # Random text doesn't compress away
+        specs.append(spec)
+    key = cache_document(probe, specs[0])
+    entry_size = (cache_dir / f"{key}.json.gz").stat().st_size
+    probe._store.clear()
+
+    cache = DocumentCache(cache_dir, max_bytes=int(entry_size * 2.5))
+    for i, spec in enumerate(specs[:2]):
+        path = cache_dir / f"{cache_document(cache, spec)}.json.gz"
+        stamp = path.stat().st_mtime - 100 * (2 - i)
+        os.utime(path, (stamp, stamp))
+    assert cache.load(str(specs[0])) is not None  # Reading marks spec0 as recently used
+
+    cache_document(cache, specs[2])
+    assert cache.load(str(specs[1])) is None
+    assert cache.load(str(specs[0])) is not None
+    assert cache.load(str(specs[2])) is not None
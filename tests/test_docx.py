@@ -0,0 +1,67 @@
+import zipfile
+
+from main import read_docx
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def paragraph(text, style=None):
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{properties}<w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def table(*rows):
+    cells = "".join(
+        "<w:tr>" + "".join(f"<w:tc>{cell}</w:tc>" for cell in row) + "</w:tr>"
+        for row in rows
+    )
+    return f"<w:tbl>{cells}</w:tbl>"
+
+
+def write_docx(path, body, part="word/document.xml"):
+    with zipfile.ZipFile(path, "w") as archive:
+        if part != "word/document.xml":
+            archive.writestr("_rels/.rels", (
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                f'relationships/officeDocument" Target="/{part}"/></Relationships>'
+            ))
+        archive.writestr(part, f"<w:document {W}><w:body>{body}</w:body></w:document>")
+    return str(path)
+
+
+def test_docx_headings_paragraphs_and_tables_in_order(tmp_path):
+    body = (
+        paragraph("Requirements", "Title")
+        + paragraph("Login", "Heading2")
+        + paragraph("Users sign in.")
+        + table(
+            [paragraph("Field"), paragraph("Rule")],
+            [paragraph("Email"), paragraph("Must contain @") + paragraph("Max 254 chars")],
+            [paragraph(""), paragraph("")],
+            [paragraph("a|b"), paragraph("pipe")],
+        )
+        + paragraph("After the table.")
+    )
+    text = read_docx(write_docx(tmp_path / "spec.docx", body))
+    assert text.split("\n") == [
+        "# Requirements",
+        "## Login",
+        "Users sign in.",
+        "| Field | Rule |",
+        "| Email | Must contain @ Max 254 chars |",
+        "| a/b | pipe |",
+        "After the table.",
+    ]
+
+
+def test_docx_nested_table_rows_join_the_enclosing_cell(tmp_path):
+    inner = table([paragraph("x"), paragraph("1")], [paragraph("y"), paragraph("2")])
+    body = table([paragraph("Outer"), paragraph("Values") + inner])
+    text = read_docx(write_docx(tmp_path / "nested.docx", body))
+    assert text == "| Outer | Values x; 1 y; 2 |"
+
+
+def test_docx_main_part_from_relationships(tmp_path):
+    path = write_docx(tmp_path / "moved.docx", paragraph("Moved body"), part="word/document2.xml")
+    assert read_docx(path) == "Moved body"
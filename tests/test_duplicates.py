@@ -0,0 +1,120 @@
+import random
+
+from main import HammingIndex, NearDuplicateIndex, find_near_duplicates, hamming_distance
+
+
+def brute_force_duplicates(image_paths, hashes, threshold):
+    """The original all-pairs scan, as a reference."""
+    kept = []
+    duplicates = {}
+    for path in image_paths:
+        value = hashes.get(path)
+        if value is None:
+            continue
+        original = next((p for p, h in kept if hamming_distance(value, h) <= threshold), None)
+        if original is None:
+            kept.append((path, value))
+        else:
+            duplicates[path] = original
+    return duplicates
+
+
+def make_hashes(count, seed=7):
+    """Random 64-bit hashes, about a third of them near-copies of an earlier one."""
+    rng = random.Random(seed)
+    paths = [f"shot_{i:05d}.png" for i in range(count)]
+    hashes = {}
+    for i, path in enumerate(paths):
+        if i and rng.random() < 0.35:
+            value = hashes[paths[rng.randrange(i)]]
+            for bit in rng.sample(range(64), rng.randint(0, 6)):
+                value ^= 1 << bit
+        else:
+            value = rng.getrandbits(64)
+        hashes[path] = value
+    return paths, hashes
+
+
+def test_hamming_index_search_matches_linear_scan():
+    rng = random.Random(1)
+    values = [rng.getrandbits(64) for _ in range(2000)]
+    # Near neighbours at every distance up to and just past the radius
+    for distance in range(7):
+        value = values[distance]
+        for bit in rng.sample(range(64), distance):
+            value ^= 1 << bit
+        values.append(value)
+    index = HammingIndex(4)
+    for position, value in enumerate(values):
+        index.add(value, position)
+    for query in values[:60] + [rng.getrandbits(64) for _ in range(50)]:
+        expected = {i for i, v in enumerate(values) if hamming_distance(query, v) <= 4}
+        assert set(index.search(query)) == expected
+
+
+def test_hamming_index_handles_hashes_longer_than_64_bits():
+    index = HammingIndex(2)
+    index.add(1 << 70, "a")
+    assert index.search((1 << 70) | 1) == ["a"]
+    assert index.search(0b111 << 71) == []
+
+
+def test_hamming_index_remove():
+    index = HammingIndex(1)
+    index.add(0b1010, "a")
+    index.add(0b1010, "b")
+    index.add(0b1011, "c")
+    index.remove(0b1010, "a")
+    assert sorted(index.search(0b1010)) == ["b", "c"]
+
+
+def test_find_near_duplicates_matches_reference_on_thousands_of_hashes():
+    paths, hashes = make_hashes(3000)
+    del hashes[paths[10]]  # Unhashed images are never duplicates
+    result = find_near_duplicates(paths, hashes, 4)
+    assert result == brute_force_duplicates(paths, hashes, 4)
+    assert len(result) > 500
+
+
+def apply_changes(duplicates, changes):
+    for path, original in changes.items():
+        if original is None:
+            duplicates.pop(path, None)
+        else:
+            duplicates[path] = original
+
+
+def test_near_duplicate_index_follows_out_of_order_adds_and_removes():
+    paths, hashes = make_hashes(600, seed=3)
+    order = {path: i for i, path in enumerate(paths)}
+    rng = random.Random(5)
+    arrival = paths[:]
+    rng.shuffle(arrival)
+    index = NearDuplicateIndex(4)
+    reported = {}
+    present = {}
+    for step, path in enumerate(arrival):
+        apply_changes(reported, index.add(path, hashes[path], order[path]))
+        present[path] = hashes[path]
+        if step % 3 == 0:
+            gone = rng.choice(list(present))
+            apply_changes(reported, index.remove(gone))
+            del present[gone]
+        if step % 50 == 0 or step == len(arrival) - 1:
+            expected = brute_force_duplicates(paths, present, 4)
+            assert index.duplicates == expected
+            assert reported == expected
+
+
+def test_near_duplicate_index_cascades_through_chains():
+    # Each hash is within the radius of its neighbours only, so statuses alternate along the chain
+    chain = [(1 << i) - 1 for i in range(0, 40, 2)]
+    paths = [f"chain_{i}" for i in range(len(chain))]
+    hashes = dict(zip(paths, chain))
+    index = NearDuplicateIndex(2)
+    for i in reversed(range(len(paths))):
+        index.add(paths[i], chain[i], i)
+    assert index.duplicates == brute_force_duplicates(paths, hashes, 2)
+    index.remove(paths[0])
+    del hashes[paths[0]]
+    assert index.duplicates == brute_force_duplicates(paths, hashes, 2)
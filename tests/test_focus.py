@@ -0,0 +1,64 @@
+from main import SectionIndex, estimate_tokens
+
+DOCUMENT = """# Overview
+The shop sells books and music online.
+
+# Login
+Users sign in with an email address and password. Five failed password
+attempts lock the account for fifteen minutes.
+
+# Checkout
+The cart total includes tax. Payment accepts cards and vouchers.
+
+# Password Reset
+A reset link is emailed and expires after one hour.
+
+# Search
+Search matches titles and authors.
+"""
+
+
+def test_scores_favour_the_matching_section():
+    index = SectionIndex(DOCUMENT)
+    scores = index.scores("voucher payment")
+    assert max(range(len(scores)), key=scores.__getitem__) == 2
+    assert scores[0] == 0
+
+
+def test_heading_terms_outweigh_body_mentions():
+    index = SectionIndex(DOCUMENT)
+    scores = index.scores("password")
+    assert scores[3] > scores[1] > 0
+
+
+def test_select_keeps_document_order_and_marks_gaps():
+    index = SectionIndex(DOCUMENT)
+    text, kept = index.select("password reset and account lock")
+    assert kept == 2
+    assert text.index("# Login") < text.index("# Password Reset")
+    assert "[...]" in text
+    assert "# Checkout" not in text
+    assert text.startswith("[2 of 5 sections most relevant to: password reset and account lock]")
+
+
+def test_select_respects_the_token_budget():
+    index = SectionIndex(DOCUMENT)
+    reset_tokens = estimate_tokens(index.sections[3])
+    text, kept = index.select("password", max_tokens=reset_tokens + 1)
+    assert kept == 1
+    assert "# Password Reset" in text
+    assert "# Login" not in text
+
+
+def test_select_truncates_when_even_the_best_section_is_too_big():
+    index = SectionIndex(DOCUMENT)
+    text, kept = index.select("checkout", max_tokens=5)
+    assert kept == 1
+    assert text.startswith("[Most relevant section, truncated]")
+    assert text.endswith(index.sections[2][:20])
+
+
+def test_select_without_matches_returns_none():
+    index = SectionIndex(DOCUMENT)
+    assert index.select("the and of") is None
+    assert index.select("spaceship") is None
@@ -0,0 +1,89 @@
+from main import SectionIndex, SuiteHistory, plan_incremental, section_fingerprint
+
+SECTIONS = [
+    "# Login\nUsers sign in with an email address and password.",
+    "# Checkout\nPayment accepts cards and vouchers.",
+    "# Search\nSearch matches titles and authors.",
+]
+
+
+def case(number, name, section):
+    block = f"TEST CASE ID: TC-{number:03d}\nTEST CASE NAME: {name}\n"
+    return {"section": section_fingerprint(SECTIONS[section]) if section is not None else None, "block": block}
+
+
+def previous_suite():
+    return {
+        "sections": [section_fingerprint(section) for section in SECTIONS],
+        "cases": [
+            case(1, "Valid login", 0),
+            case(2, "Voucher payment", 1),
+            case(3, "Search by author", 2),
+            case(4, "General smoke test", None),
+        ],
+        "title": "Shop",
+    }
+
+
+def test_fingerprint_ignores_reflow():
+    assert section_fingerprint("# Login\nUsers sign in\nwith email.") == \
+        section_fingerprint("# Login  Users sign in with email.\n")
+    assert section_fingerprint("# Login\nUsers sign in.") != section_fingerprint("# Login\nUsers log in.")
+
+
+def test_unchanged_document_has_nothing_to_regenerate():
+    plan = plan_incremental(previous_suite(), SECTIONS)
+    assert plan["changed"] == []
+    assert plan["removed"] == 0
+    assert len(plan["reused"]) == 4
+    assert plan["title"] == "Shop"
+
+
+def test_changed_section_retires_its_cases():
+    sections = [SECTIONS[0], "# Checkout\nPayment accepts cards only.", SECTIONS[2]]
+    plan = plan_incremental(previous_suite(), sections)
+    assert plan["changed"] == [1]
+    assert plan["removed"] == 1
+    assert plan["retired_ids"] == {"voucher payment": 2}
+    assert [position for position, _ in plan["reused"]] == [0, 2, 3]
+
+
+def test_reused_cases_follow_moved_sections():
+    sections = [SECTIONS[2], "# Wishlist\nUsers save books for later.", SECTIONS[0], SECTIONS[1]]
+    plan = plan_incremental(previous_suite(), sections)
+    assert plan["changed"] == [1]
+    assert plan["removed"] == 0
+    positions = {block.split("\n")[1]: position for position, block in plan["reused"]}
+    assert positions == {
+        "TEST CASE NAME: Valid login": 2,
+        "TEST CASE NAME: Voucher payment": 3,
+        "TEST CASE NAME: Search by author": 0,
+        "TEST CASE NAME: General smoke test": 4,
+    }
+
+
+def test_fully_rewritten_document_has_no_plan():
+    assert plan_incremental(previous_suite(), ["# New\nEverything changed."]) is None
+
+
+def test_history_round_trip(tmp_path):
+    history = SuiteHistory(tmp_path / "history")
+    document = "\n\n".join(SECTIONS)
+    suite = (
+        "TEST SUITE: Shop\n\n"
+        "TEST CASE ID: TC-001\nTEST CASE NAME: Valid login\nSTEPS: sign in with email and password\n\n"
+        "TEST CASE ID: TC-002\nTEST CASE NAME: Voucher payment\nSTEPS: pay with vouchers at checkout\n"
+    )
+    key = SuiteHistory.suite_key(str(tmp_path / "spec.md"), "functional", "", "model")
+    history.record(key, document, suite, SectionIndex(document))
+    entry = history.load(key)
+    assert entry["title"] == "Shop"
+    assert entry["sections"] == [section_fingerprint(section) for section in SECTIONS]
+    assert [c["section"] for c in entry["cases"]] == entry["sections"][:2]
+    assert history.load("missing") is None
+
+
+def test_suite_key_depends_on_the_full_path(tmp_path):
+    first = SuiteHistory.suite_key(str(tmp_path / "a" / "spec.md"), "functional", "", "model")
+    second = SuiteHistory.suite_key(str(tmp_path / "b" / "spec.md"), "functional", "", "model")
+    assert first != second
@@ -0,0 +1,47 @@
+import pytest
+
+from main import TokenBucket
+
+
+def elapse(bucket, seconds):
+    """Pretend seconds have passed since the bucket last refilled."""
+    bucket.updated -= seconds
+
+
+def test_full_bucket_has_no_delay():
+    bucket = TokenBucket(60)
+    assert bucket.delay_for(60) == 0.0
+
+
+def test_delay_is_time_to_refill_the_shortfall():
+    bucket = TokenBucket(60)  # One token per second
+    bucket.consume(60)
+    assert bucket.delay_for(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.delay_for(30) == pytest.approx(30.0, abs=0.05)
+
+
+def test_bucket_refills_over_time_up_to_capacity():
+    bucket = TokenBucket(120)
+    bucket.consume(120)
+    elapse(bucket, 15)
+    assert bucket.delay_for(30) == 0.0
+    assert bucket.delay_for(31) == pytest.approx(0.5, abs=0.05)
+    elapse(bucket, 3600)
+    bucket.delay_for(1)
+    assert bucket.tokens == 120
+
+
+def test_oversized_request_waits_for_a_full_bucket():
+    bucket = TokenBucket(1000)
+    assert bucket.delay_for(5000) == 0.0
+    bucket.consume(5000)
+    assert bucket.tokens == pytest.approx(0.0, abs=1)
+    assert bucket.delay_for(5000) == pytest.approx(60.0, abs=0.1)
+
+
+def test_retries_can_overdraw_the_bucket():
+    bucket = TokenBucket(60)
+    bucket.consume(60)
+    bucket.consume(10)
+    assert bucket.tokens == pytest.approx(-10, abs=0.1)
+    assert bucket.delay_for(1) == pytest.approx(11.0, abs=0.1)
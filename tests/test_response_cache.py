@@ -0,0 +1,58 @@
+import os
+
+from main import ResponseCache
+
+
+def age(cache_dir, key, seconds_ago):
+    path = cache_dir / f"{key}.json"
+    stamp = path.stat().st_mtime - seconds_ago
+    os.utime(path, (stamp, stamp))
+
+
+def test_round_trip_and_miss(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put("a", "suite text")
+    assert cache.get("a") == "suite text"
+    assert cache.get("b") is None
+
+
+def test_key_covers_every_input():
+    base = ResponseCache.make_key("prompt", ["d1", "d2"], None, "model")
+    assert base == ResponseCache.make_key("prompt", ["d1", "d2"], None, "model")
+    assert base != ResponseCache.make_key("prompt", ["d2", "d1"], None, "model")
+    assert base != ResponseCache.make_key("prompt!", ["d1", "d2"], None, "model")
+    assert base != ResponseCache.make_key("prompt", ["d1", "d2"], "video", "model")
+    assert base != ResponseCache.make_key("prompt", ["d1", "d2"], None, "other-model")
+    assert base != ResponseCache.make_key("prompt", ["d1", "d2"], None, "model", options="hedge")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = len('{"created_at": "2026-01-01T00:00:00.000000", "text": ""}') + 1000
+    cache = ResponseCache(tmp_path, max_bytes=int(entry_size * 3.5))
+    for key, seconds_ago in (("a", 400), ("b", 300), ("c", 200)):
+        cache.put(key, "x" * 1000)
+        age(tmp_path, key, seconds_ago)
+    assert cache.get("a") is not None  # Reading marks "a" as recently used
+
+    cache.put("d", "x" * 1000)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+
+
+def test_corrupt_entries_read_as_misses(tmp_path):
+    cache = ResponseCache(tmp_path)
+    (tmp_path / "broken.json").write_text("{not json")
+    (tmp_path / "list.json").write_text("[1, 2]")
+    (tmp_path / "no_text.json").write_text('{"text": 5}')
+    for key in ("broken", "list", "no_text"):
+        assert cache.get(key) is None
+        assert not (tmp_path / f"{key}.json").exists()
+
+
+def test_clear(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put("a", "one")
+    cache.put("b", "two")
+    cache.clear()
+    assert cache.get("a") is None
+    assert list(tmp_path.iterdir()) == []
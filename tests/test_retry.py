@@ -0,0 +1,90 @@
+import random
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from main import GeminiWorker, ProgressTracker, RetryPolicy, is_retryable
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Raises the queued errors in turn, then answers."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_content(self, content, request_options=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return FakeResponse("suite")
+
+
+def make_worker(policy):
+    worker = GeminiWorker("key", [], "document", None, "Functional", "", "document", retry_policy=policy)
+    worker._tracker = ProgressTracker(["generate"], lambda value: None, lambda text: None)
+    return worker
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    random.seed(3)
+    for attempt in range(1, 8):
+        cap = min(5.0, 2 ** (attempt - 1))
+        delays = [policy.backoff(attempt) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert max(delays) > cap * 0.8
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (google_exceptions.ResourceExhausted("quota"), True),
+    (google_exceptions.ServiceUnavailable("busy"), True),
+    (google_exceptions.DeadlineExceeded("slow"), True),
+    (ConnectionError("reset"), True),
+    (google_exceptions.InvalidArgument("bad"), False),
+    (google_exceptions.PermissionDenied("key"), False),
+    (ValueError("blocked"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_transient_errors_are_retried_and_charged():
+    worker = make_worker(RetryPolicy(max_attempts=3, base_delay=0.0))
+    charged = []
+    worker.charge_request = lambda: charged.append(1)
+    model = FakeModel(google_exceptions.ServiceUnavailable("busy"), google_exceptions.ResourceExhausted("quota"))
+    assert worker._generate_with_retry(model, ["prompt"], stream=False) == "suite"
+    assert model.calls == 3
+    assert len(charged) == 2
+    assert [a["error"] is None for a in worker.attempts] == [False, False, True]
+
+
+def test_permanent_error_is_not_retried():
+    worker = make_worker(RetryPolicy(max_attempts=3, base_delay=0.0))
+    model = FakeModel(google_exceptions.InvalidArgument("bad"))
+    with pytest.raises(google_exceptions.InvalidArgument):
+        worker._generate_with_retry(model, ["prompt"], stream=False)
+    assert model.calls == 1
+
+
+def test_gives_up_after_max_attempts():
+    worker = make_worker(RetryPolicy(max_attempts=2, base_delay=0.0))
+    model = FakeModel(*(google_exceptions.ServiceUnavailable("busy") for _ in range(3)))
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        worker._generate_with_retry(model, ["prompt"], stream=False)
+    assert model.calls == 2
+
+
+def test_backoff_past_the_deadline_gives_up():
+    worker = make_worker(RetryPolicy(max_attempts=5, base_delay=100.0, max_delay=100.0, overall_deadline=1.0))
+    random.seed(1)
+    model = FakeModel(google_exceptions.ServiceUnavailable("busy"))
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        worker._generate_with_retry(model, ["prompt"], stream=False)
+    assert model.calls == 1
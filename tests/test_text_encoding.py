@@ -0,0 +1,57 @@
+import codecs
+
+import pytest
+
+from main import ParseCancelled, detect_encoding, read_text, read_text_sample
+
+
+@pytest.mark.parametrize("encoding, expected", [
+    ("utf-8-sig", "utf-8-sig"),
+    ("utf-16", "utf-16"),
+    ("utf-32", "utf-32"),
+    ("utf-16-le", "utf-16-le"),
+    ("utf-16-be", "utf-16-be"),
+    ("utf-8", "utf-8"),
+    ("cp1252", "cp1252"),
+])
+def test_detect_encoding(encoding, expected):
+    sample = ("Café menu – “specials” " * 20).encode(encoding)
+    assert detect_encoding(sample) == expected
+
+
+def test_detect_encoding_tolerates_a_cut_character():
+    sample = "naïve résumé ✓".encode("utf-8")
+    assert detect_encoding(sample[:-1]) == "utf-8"
+
+
+def test_detect_encoding_falls_back_to_latin1():
+    assert detect_encoding(b"abc \x81\x8d\x8f\x90\x9d") == "latin-1"
+
+
+def test_read_text_decodes_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr("main.TEXT_READ_BLOCK_BYTES", 5)
+    text = "héllo wörld ✓ " * 40
+    path = tmp_path / "spec.txt"
+    path.write_bytes(text.encode("utf-8") + b"\xff end")
+    progress = []
+    assert read_text(str(path), "utf-8", lambda done, total: progress.append((done, total))) == text + "� end"
+    assert progress[-1][0] == progress[-1][1] == path.stat().st_size
+
+    path.write_bytes(codecs.BOM_UTF16_LE + text.encode("utf-16-le"))
+    assert read_text(str(path), "utf-16") == text
+
+
+def test_read_text_stops_when_cancelled(tmp_path):
+    path = tmp_path / "spec.txt"
+    path.write_text("some text")
+    with pytest.raises(ParseCancelled):
+        read_text(str(path), "utf-8", is_cancelled=lambda: True)
+
+
+def test_read_text_sample(tmp_path):
+    path = tmp_path / "spec.md"
+    path.write_bytes("# Überblick\n".encode("utf-16"))
+    assert read_text_sample(str(path)) == ("utf-16", "# Überblick\n")
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert read_text_sample(str(empty)) == ("utf-8", "")
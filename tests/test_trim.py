@@ -0,0 +1,46 @@
+import pytest
+
+from main import LOW_VALUE_SECTION_PATTERN, estimate_tokens, trim_document
+
+
+@pytest.mark.parametrize("heading", [
+    "Table of Contents",
+    "CONTENTS",
+    "## Revision History",
+    "7. References",
+    "3.2 Glossary",
+    "Appendix B: Error Codes",
+    "Copyright 2024 Acme Corp",
+    "Acknowledgements",
+    "Index",
+])
+def test_boilerplate_headings_are_low_value(heading):
+    assert LOW_VALUE_SECTION_PATTERN.search(heading)
+
+
+@pytest.mark.parametrize("heading", [
+    "User Preferences",
+    "3.2 Notification Preferences",
+    "Contents of the cart",
+    "## Cart contents and totals",
+    "Indexing of saved searches",
+    "Glossary screen layout",
+    "Cross-references between orders",
+])
+def test_requirement_headings_are_not_low_value(heading):
+    assert not LOW_VALUE_SECTION_PATTERN.search(heading)
+
+
+def test_trim_drops_boilerplate_before_requirement_sections():
+    body = "The user can change this setting at any time. " * 40
+    sections = [
+        f"# Login\n{body}",
+        f"# User Preferences\n{body}",
+        f"# Contents of the cart\n{body}",
+        f"# References\n{body}",
+    ]
+    text = "\n\n".join(sections)
+    trimmed = trim_document(text, estimate_tokens(text) - estimate_tokens(sections[3]) // 2)
+    assert "# References" not in trimmed
+    for heading in ("# Login", "# User Preferences", "# Contents of the cart"):
+        assert heading in trimmed